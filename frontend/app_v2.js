@@ -48,7 +48,7 @@ function watchProgress(requestId) {
     if (msg.type === "progress") {
       results[msg.index] = msg.result;
       displayResults(results.filter((r) => r));
-      updateProgress(results.filter((r) => r).length);
+      updateProgress(msg.completed ?? results.filter((r) => r).length);
     } else if (msg.type === "final") {
       if (msg.error) {
         document.getElementById("stderr").textContent = msg.error;
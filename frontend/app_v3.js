@@ -84,7 +84,8 @@ function watchProgress(requestId) {
         totalRuns = msg.total;
       }
       results[msg.index] = msg.result;
-      const completed = results.filter((r) => r).length;
+      // 워커가 통과한 케이스를 묶어 보내면 completed가 실제 완료 수를 알려 준다.
+      const completed = msg.completed ?? results.filter((r) => r).length;
       displayRunResults(results.filter((r) => r));
       updateProgress(completed);
     } else if (msg.type === "final") {
@@ -0,0 +1,140 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import stat
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .private_dir import private_dir, trusted
+from .utils.logging_middleware_worker import (
+    logger,
+    COMPILE_CACHE_HITS,
+    COMPILE_CACHE_MISSES,
+    COMPILE_CACHE_EVICTIONS,
+)
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """Hard-link ``src`` to ``dst``, copying when linking is not possible."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class CompileCache:
+    """
+    Content-addressed on-disk cache of compiled artifacts.
+
+    Every entry is a directory ``<root>/<key>`` holding the files produced by
+    one compilation. Entries are published with an atomic ``rename`` so
+    several workers on the same host can share the cache without locking on
+    the read path; eviction is serialized with an ``flock`` on ``<root>/.lock``.
+    Least recently used entries (by directory mtime, refreshed on every hit)
+    are removed once the cache grows beyond ``max_bytes``.
+
+    Entries are executed as judge binaries, so the root must be private to
+    the worker's user (``PermissionError`` otherwise) and an entry is only
+    used if it and its files are owned by us and not writable by others.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = private_dir(str(root), "oj-compile-cache")
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(lang: str, code: str, flags: Iterable[str], compiler: str) -> str:
+        blob = json.dumps([lang, list(flags), compiler, code]).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def fetch(self, key: str, lang: str, dest: Path) -> bool:
+        """
+        Materialize entry ``key`` at ``dest`` and return False on a miss.
+
+        If ``dest`` is a directory every file of the entry is linked into it,
+        otherwise the entry's single file is linked to the path ``dest``.
+        """
+        entry = self.root / key
+        try:
+            names = os.listdir(entry)
+            if not trusted(entry, directory=True) or not all(trusted(entry / name) for name in names):
+                logger.warning("Ignoring compile cache entry %s: not owned by this user or writable by others", key)
+                raise ValueError(key)
+            if dest.is_dir():
+                for name in names:
+                    _link_or_copy(entry / name, dest / name)
+            else:
+                (name,) = names
+                _link_or_copy(entry / name, dest)
+            os.utime(entry)
+        except (OSError, ValueError):
+            # 없거나, 읽는 도중에 다른 워커가 evict함
+            COMPILE_CACHE_MISSES.labels(language=lang).inc()
+            return False
+        COMPILE_CACHE_HITS.labels(language=lang).inc()
+        return True
+
+    def store(self, key: str, files: Iterable[Path]) -> None:
+        """Publish ``files`` as entry ``key``. Losing a race to another worker is fine."""
+        staging = self.root / f".tmp-{uuid.uuid4().hex}"
+        try:
+            staging.mkdir(mode=0o700)
+            for f in files:
+                _link_or_copy(f, staging / f.name)
+                # 그룹/다른 사용자 쓰기 권한이 있으면 fetch()가 신뢰하지 않으므로 미리 뺀다.
+                mode = os.lstat(staging / f.name).st_mode
+                os.chmod(staging / f.name, stat.S_IMODE(mode) & ~(stat.S_IWGRP | stat.S_IWOTH))
+            os.rename(staging, self.root / key)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self._evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _evict(self) -> None:
+        with open(self.root / ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # 다른 워커가 이미 정리 중
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                # rename 후 삭제하여, 읽는 쪽은 완전한 엔트리 또는 miss만 보게 한다.
+                trash = self.root / f".trash-{uuid.uuid4().hex}"
+                try:
+                    os.rename(entry, trash)
+                except OSError:
+                    continue
+                shutil.rmtree(trash, ignore_errors=True)
+                total -= size
+                COMPILE_CACHE_EVICTIONS.inc()
+                logger.info("Evicted compile cache entry %s", entry.name)
+
+
+def compile_cache_from_env() -> Optional[CompileCache]:
+    """Build the cache from ``COMPILE_CACHE_*`` environment variables, or None if disabled."""
+    if os.getenv("COMPILE_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    max_bytes = int(os.getenv("COMPILE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    try:
+        return CompileCache(private_dir(os.getenv("COMPILE_CACHE_DIR"), "oj-compile-cache"), max_bytes)
+    except OSError as e:
+        logger.warning("Compile cache disabled: %s", e)
+        return None
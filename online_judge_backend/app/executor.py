@@ -1,17 +1,17 @@
 import asyncio
+import contextlib
+import math
 import os
+import signal
 import time
 import uuid
+from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Callable, Awaitable
+from typing import Optional, Callable, Awaitable, Sequence
 
 from pathlib import Path
-from tempfile import NamedTemporaryFile
-import tempfile
-import shutil
 import re
 from dotenv import load_dotenv
-import psutil
 
 from .utils.logging_middleware_worker import (
     logger,
@@ -23,6 +23,17 @@ from .utils.logging_middleware_worker import (
 env_path = Path(__file__).resolve().parents[1] / ".env"
 load_dotenv(dotenv_path=env_path, override=False)
 
+from .compile_cache import CompileCache, compile_cache_from_env
+from .output_stream import OutputSink
+from .process import JudgedProcess, MemoryCgroup, PythonZygote
+from .sandbox import BOX_DIR, IsolatePool, SandboxError, sandbox_from_env
+from .scratch import scratch_space
+
+_compile_cache: Optional[CompileCache] = compile_cache_from_env()
+_compiler_versions: dict[str, str] = {}
+# EXECUTION_BACKEND=isolate이면 컴파일과 실행을 isolate 박스 안에서 한다 (기본: 로컬 프로세스).
+_sandbox: Optional[IsolatePool] = sandbox_from_env()
+
 from pydantic import BaseModel
 
 
@@ -38,63 +49,137 @@ class ExecutionResult(BaseModel):
     stdout: str
     stderr: str
     exitCode: int
-    duration: float  # milliseconds
+    duration: float  # milliseconds (= cpuTime)
     memoryUsed: int  # kilobytes
     timedOut: bool
+    # 스트리밍 채점 결과 (기대 출력이 주어졌을 때만 설정됨)
+    outputMatched: Optional[bool] = None
+    stoppedOnMismatch: bool = False  # 출력이 어긋나는 즉시 프로세스를 종료함
+    outputLimitExceeded: bool = False
+    outputTruncated: bool = False  # stdout/stderr는 앞부분만 담겨 있음
+    memoryLimitExceeded: bool = False
+    cpuTime: float = 0.0  # milliseconds, user+sys from rusage
+    wallTime: float = 0.0  # milliseconds
+
+
+# 출력 제한: 이를 넘기면 프로세스를 종료한다. 결과에는 앞부분만 보관한다.
+OUTPUT_LIMIT_BYTES = int(os.getenv("OUTPUT_LIMIT_BYTES", str(16 * 1024 * 1024)))
+OUTPUT_KEEP_BYTES = int(os.getenv("OUTPUT_KEEP_BYTES", str(1024 * 1024)))
+_READ_CHUNK = 64 * 1024
+
+# 시간 제한은 CPU 시간(user+sys)으로 판정하고 RLIMIT_CPU로 강제한다.
+# 벽시계 시간은 sleep/대기 중인 프로그램을 끊기 위한 느슨한 보조 제한이다 (CPU 제한 x WALL_TIME_FACTOR).
+WALL_TIME_FACTOR = float(os.getenv("WALL_TIME_FACTOR", "2.0"))
+
+# Warm runtime: 파이썬은 작업마다 zygote 하나가 코드를 한 번 컴파일해 두고, 테스트케이스마다 fork한다.
+WARM_RUNTIME = os.getenv("WARM_RUNTIME", "true").lower() in ("1", "true", "yes")
+# JVM은 fork할 수 없으므로 시작 비용을 줄이는 옵션으로 대신한다 (CDS 공유 아카이브, Serial GC).
+JAVA_RUN_OPTS = os.getenv("JAVA_RUN_OPTS", "-Xshare:auto -XX:+UseSerialGC").split()
+# 컴파일 시간 제한 (초). 파이썬 zygote가 코드를 컴파일할 때도 이 안에 끝나야 한다.
+COMPILE_TIME_LIMIT_SECONDS = float(os.getenv("COMPILE_TIME_LIMIT_SECONDS", "10"))
+
+# 메모리 제한: JUDGE_CGROUP_ROOT(쓰기 가능한 cgroup v2 디렉터리)가 있으면 실행마다
+# 하위 cgroup을 만들어 memory.max로 강제하고, 없으면 RLIMIT_AS(+여유분)로 강제한다.
+JUDGE_CGROUP_ROOT = Path(os.environ["JUDGE_CGROUP_ROOT"]) if os.getenv("JUDGE_CGROUP_ROOT") else None
+MEMORY_AS_SLACK_MB = int(os.getenv("MEMORY_AS_SLACK_MB", "32"))
+# Java는 메모리 제한을 힙(-Xmx)에 주고, JVM 자체(메타스페이스, 코드 캐시, 스레드 스택 등)의
+# 몫으로 이만큼을 더 허용한다. cgroup과 RSS 판정 모두 (제한 + 이 값)을 기준으로 한다.
+JAVA_MEMORY_OVERHEAD_MB = int(os.getenv("JAVA_MEMORY_OVERHEAD_MB", "64"))
+# 메모리 할당 실패로 비정상 종료했음을 보여 주는 stderr 패턴
+_OOM_MARKERS = re.compile(r"MemoryError|std::bad_alloc|java\.lang\.OutOfMemoryError|Cannot allocate memory")
+
+
+def _pin_to_cpu(cpu: Optional[int]) -> Optional[Callable[[], None]]:
+    """Return a ``preexec_fn`` that pins the child process to ``cpu``."""
+    if cpu is None or not hasattr(os, "sched_setaffinity"):
+        return None
+
+    def _pin() -> None:
+        os.sched_setaffinity(0, {cpu})
+
+    return _pin
+
+
+async def _compiler_version(compiler: str) -> str:
+    """Return the first line of ``<compiler> --version`` (memoized)."""
+    if compiler not in _compiler_versions:
+        process = await asyncio.create_subprocess_exec(
+            compiler,
+            "--version",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        stdout, _ = await process.communicate()
+        output = stdout.decode(errors="replace").strip()
+        _compiler_versions[compiler] = output.splitlines()[0] if output else compiler
+    return _compiler_versions[compiler]
+
+
+async def _run_compiler(cmd: list[str], workdir: Path) -> tuple[int, str]:
+    """Run a compiler in ``workdir`` (relative paths) and return ``(returncode, stderr)``."""
+    if _sandbox:
+        return await _sandbox.compile(cmd, workdir)
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=workdir,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    return process.returncode, stderr.decode()
 
 
 async def compile_code(
-    lang: SupportedLanguage, code: str, token: Optional[str] = None
+    lang: SupportedLanguage, code: str, token: Optional[str] = None, *, workdir: Path
 ) -> Path:
-    """Compile code and return a path to the executable or script."""
+    """
+    Compile code and return a path to the executable or script.
 
+    Sources and artifacts are written to ``workdir`` (the job's scratch
+    directory), which the caller removes.
+    """
     if lang is SupportedLanguage.python:
-        tmp = NamedTemporaryFile("w", suffix=".py", delete=False)
-        tmp.write(code)
-        tmp.close()
-        return Path(tmp.name)
+        script = workdir / "main.py"
+        script.write_text(code)
+        return script
 
     if lang in (SupportedLanguage.c, SupportedLanguage.cpp):
-        suffix = ".c" if lang is SupportedLanguage.c else ".cpp"
-        src = NamedTemporaryFile("w", suffix=suffix, delete=False)
-        src.write(code)
-        src.close()
-        exe_path = Path(src.name).with_suffix("")
+        src_name = "main.c" if lang is SupportedLanguage.c else "main.cpp"
+        exe_path = workdir / "main"
         compiler = "gcc" if lang is SupportedLanguage.c else "g++"
-        process = await asyncio.create_subprocess_exec(
-            compiler,
-            src.name,
-            "-O2",
-            "-o",
-            str(exe_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await process.communicate()
-        if process.returncode != 0:
-            os.remove(src.name)
-            raise RuntimeError(stderr.decode() or "Compilation failed")
-        os.remove(src.name)
+        flags = ["-O2"]
+        cache_key = None
+        if _compile_cache:
+            cache_key = CompileCache.key(lang.value, code, flags, await _compiler_version(compiler))
+            if _compile_cache.fetch(cache_key, lang.value, exe_path):
+                return exe_path
+        (workdir / src_name).write_text(code)
+        returncode, stderr = await _run_compiler([compiler, src_name, *flags, "-o", "main"], workdir)
+        os.remove(workdir / src_name)
+        if returncode != 0:
+            raise RuntimeError(stderr or "Compilation failed")
+        scratch_space().check_quota(workdir)
+        if cache_key:
+            _compile_cache.store(cache_key, [exe_path])
         return exe_path
 
     if lang is SupportedLanguage.java:
         match = re.search(r"public\s+class\s+(\w+)", code)
         class_name = match.group(1) if match else "Main"
-        tmpdir = Path(tempfile.mkdtemp())
-        src_path = tmpdir / f"{class_name}.java"
-        with open(src_path, "w") as f:
-            f.write(code)
-        process = await asyncio.create_subprocess_exec(
-            "javac",
-            str(src_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await process.communicate()
-        if process.returncode != 0:
-            shutil.rmtree(tmpdir, ignore_errors=True)
-            raise RuntimeError(stderr.decode() or "Compilation failed")
-        return tmpdir / f"{class_name}.class"
+        cache_key = None
+        if _compile_cache:
+            cache_key = CompileCache.key(lang.value, code, [], await _compiler_version("javac"))
+            if _compile_cache.fetch(cache_key, lang.value, workdir):
+                return workdir / f"{class_name}.class"
+        src_name = f"{class_name}.java"
+        (workdir / src_name).write_text(code)
+        returncode, stderr = await _run_compiler(["javac", src_name], workdir)
+        if returncode != 0:
+            raise RuntimeError(stderr or "Compilation failed")
+        scratch_space().check_quota(workdir)
+        if cache_key:
+            _compile_cache.store(cache_key, workdir.glob("*.class"))
+        return workdir / f"{class_name}.class"
 
     raise NotImplementedError(f"Compilation for '{lang}' is not supported yet")
 
@@ -105,67 +190,180 @@ async def run_code(
     stdin: str,
     time_limit: int,
     memory_limit: int,
+    cpu: Optional[int] = None,
+    expected: Optional[str] = None,
+    wall_limit: Optional[int] = None,
+    zygote: Optional[PythonZygote] = None,
 ) -> ExecutionResult:
-    """Run previously compiled code and return the execution result."""
+    """
+    Run previously compiled code and return the execution result.
+
+    ``time_limit`` (ms) limits user+sys CPU time, which is also reported as
+    ``duration``/``cpuTime``. The process is killed after ``wall_limit`` ms of
+    wall-clock time (default ``time_limit * WALL_TIME_FACTOR``).
+
+    A Python submission is forked from ``zygote`` when one is given.
+
+    If ``cpu`` is given, the process is pinned to that core. stdout is read
+    incrementally: the process is killed once it writes more than
+    ``OUTPUT_LIMIT_BYTES``, or, when ``expected`` is given, as soon as its
+    output can no longer match it (same semantics as comparing ``strip()``ed
+    strings). Only the first ``OUTPUT_KEEP_BYTES`` of stdout/stderr are kept.
+
+    ``memory_limit`` (MB) is enforced by the kernel and ``memoryUsed`` is the
+    kernel-accounted peak (cgroup ``memory.peak`` or ``wait4`` max RSS). For
+    Java the limit is the heap (``-Xmx``) and the whole JVM may use
+    ``JAVA_MEMORY_OVERHEAD_MB`` more.
+    With the isolate backend the run happens in a pooled box and limits and
+    usage come from isolate (meta file).
+    """
+    # 샌드박스에서는 작업 디렉터리의 파일이 박스 디렉터리로 복사되어 실행된다.
+    base = BOX_DIR if _sandbox else file_path.parent
     if lang is SupportedLanguage.python:
-        cmd = ["python3", str(file_path)]
+        cmd = ["python3", str(base / file_path.name)]
     elif lang in (SupportedLanguage.c, SupportedLanguage.cpp):
-        cmd = [str(file_path)]
+        cmd = [str(base / file_path.name)]
     elif lang is SupportedLanguage.java:
         cmd = [
             "java",
+            *JAVA_RUN_OPTS,
             "-cp",
-            str(file_path.parent),
+            str(base),
             file_path.stem,
         ]
     else:
         raise NotImplementedError(f"Execution for '{lang}' is not supported yet")
 
+    # 프로세스 전체(RSS)에 허용하는 양. Java는 힙 바깥 JVM 메모리만큼 더 준다.
+    process_limit_mb = memory_limit
+    if lang is SupportedLanguage.java:
+        process_limit_mb += JAVA_MEMORY_OVERHEAD_MB
+    limit_bytes = process_limit_mb * 1024 * 1024
+    cgroup = MemoryCgroup(JUDGE_CGROUP_ROOT, limit_bytes) if JUDGE_CGROUP_ROOT and not _sandbox else None
+    uses_cgroup = cgroup is not None or (_sandbox is not None and _sandbox.use_cgroups)
+    # cgroup이 없으면 주소 공간 제한(RLIMIT_AS)으로 대신한다. JVM은 큰 가상 메모리를
+    # 예약하므로 RLIMIT_AS 대신 힙 크기로 제한한다.
+    as_limit = 0
+    if lang is SupportedLanguage.java:
+        cmd.insert(1, f"-Xmx{memory_limit}m")
+    elif not uses_cgroup:
+        as_limit = limit_bytes + MEMORY_AS_SLACK_MB * 1024 * 1024
+    if wall_limit is None:
+        wall_limit = int(time_limit * WALL_TIME_FACTOR)
+
     start = time.perf_counter()
-    process = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
+    try:
+        if _sandbox is not None:
+            process = await _sandbox.start(
+                file_path.parent,
+                cmd,
+                time_limit=time_limit / 1000,
+                wall_limit=wall_limit / 1000,
+                memory_limit_bytes=as_limit,
+                cg_memory_bytes=limit_bytes,
+                preexec_fn=_pin_to_cpu(cpu),
+            )
+        elif zygote is not None:
+            process = await JudgedProcess.fork(
+                zygote,
+                memory_limit_bytes=as_limit,
+                cpu_limit_seconds=math.ceil(time_limit / 1000),
+                cgroup=cgroup,
+                cpu=cpu,
+            )
+        else:
+            process = await JudgedProcess.start(
+                cmd,
+                memory_limit_bytes=as_limit,
+                cpu_limit_seconds=math.ceil(time_limit / 1000),
+                cgroup=cgroup,
+                preexec_fn=_pin_to_cpu(cpu),
+            )
+    except BaseException:
+        if cgroup:
+            cgroup.remove()
+        raise
 
-    async def _track_memory_usage(pid: int) -> int:
-        """Return peak RSS in bytes for the given process."""
-        peak = 0
-        try:
-            proc = psutil.Process(pid)
-        except psutil.Error:
-            return peak
-        while True:
-            try:
-                mem = proc.memory_info().rss
-                peak = max(peak, mem)
-                if not proc.is_running():
-                    break
-            except psutil.NoSuchProcess:
-                break
-            await asyncio.sleep(0.05)
-        return peak
+    stdout_sink = OutputSink(OUTPUT_KEEP_BYTES, expected)
+    stderr_sink = OutputSink(OUTPUT_KEEP_BYTES)
+    stopped_on_mismatch = False
+    output_limit_exceeded = False
 
-    mem_task = asyncio.create_task(_track_memory_usage(process.pid))
+    def _kill() -> None:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
 
-    # ``process.communicate`` sends the entire input and closes stdin. If the
-    # executed program requests more data than provided, it receives EOF instead
-    # of blocking indefinitely.
+    async def _feed_stdin() -> None:
+        # 입력 전체를 보낸 뒤 stdin을 닫는다. 프로그램이 더 읽으려 하면 EOF를 받는다.
+        try:
+            process.stdin.write(stdin.encode())
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            process.stdin.close()
+
+    async def _read_stdout() -> None:
+        nonlocal stopped_on_mismatch, output_limit_exceeded
+        while chunk := await process.stdout.read(_READ_CHUNK):
+            stdout_sink.feed(chunk)
+            if stdout_sink.total > OUTPUT_LIMIT_BYTES and not output_limit_exceeded:
+                output_limit_exceeded = True
+                _kill()
+            if stdout_sink.matcher and stdout_sink.matcher.diverged and not stopped_on_mismatch:
+                stopped_on_mismatch = True
+                _kill()
+        stdout_sink.close()
+
+    async def _read_stderr() -> None:
+        while chunk := await process.stderr.read(_READ_CHUNK):
+            stderr_sink.feed(chunk)
+
+    io_tasks = [
+        asyncio.create_task(_feed_stdin()),
+        asyncio.create_task(_read_stdout()),
+        asyncio.create_task(_read_stderr()),
+        asyncio.create_task(process.wait()),
+    ]
 
     timed_out = False
     try:
-        stdout, stderr = await asyncio.wait_for(
-            process.communicate(stdin.encode()), timeout=time_limit / 1000
-        )
-    except asyncio.TimeoutError:
-        process.kill()
-        stdout, stderr = await process.communicate()
-        timed_out = True
+        _, pending = await asyncio.wait(io_tasks, timeout=wall_limit / 1000)
+        if pending:
+            _kill()
+            timed_out = True
+            await asyncio.gather(*pending)
+    except asyncio.CancelledError:
+        # 병렬 실행 중 early stop으로 취소되면 프로세스를 남기지 않는다.
+        _kill()
+        await process.wait()
+        for task in io_tasks:
+            task.cancel()
+        raise
+    finally:
+        if cgroup:
+            peak_kb = cgroup.peak_kb()
+            oom_killed = cgroup.oom_killed()
+            cgroup.remove()
 
-    duration = (time.perf_counter() - start) * 1000  # ms
+    wall_time = (time.perf_counter() - start) * 1000  # ms
     exit_code = process.returncode if process.returncode is not None else -1
-    peak_rss = await mem_task
+    cpu_time = (process.usage.user_time + process.usage.sys_time) * 1000  # ms
+    # RLIMIT_CPU는 초 단위이므로, 정확한 판정은 rusage로 한다.
+    timed_out = timed_out or exit_code == -signal.SIGXCPU or cpu_time > time_limit
+    memory_used = process.usage.max_rss_kb
+    if cgroup and peak_kb is not None:
+        memory_used = peak_kb
+    memory_exceeded = (
+        memory_used > process_limit_mb * 1024
+        or (cgroup is not None and oom_killed)
+        or process.usage.oom_killed
+        # RLIMIT_AS/-Xmx에 걸리면 프로세스는 할당 실패로 스스로 종료한다.
+        or (exit_code != 0 and _OOM_MARKERS.search(stderr_sink.text) is not None)
+    )
 
     logger.info(f"Execution finished: {lang} {file_path} " )
         #   f"Exit code: {exit_code}, Duration: {duration:.2f} ms, "
@@ -173,15 +371,48 @@ async def run_code(
     
     return ExecutionResult(
         requestId=str(uuid.uuid4()),
-        stdout=stdout.decode(),
-        stderr=stderr.decode(),
+        stdout=stdout_sink.text,
+        stderr=stderr_sink.text,
         exitCode=exit_code,
-        duration=duration,
-        memoryUsed=int(peak_rss / 1024),
-        timedOut=timed_out,
+        duration=cpu_time,
+        memoryUsed=memory_used,
+        timedOut=timed_out and not (stopped_on_mismatch or output_limit_exceeded),
+        memoryLimitExceeded=memory_exceeded,
+        outputMatched=stdout_sink.matcher.matched if stdout_sink.matcher else None,
+        stoppedOnMismatch=stopped_on_mismatch,
+        outputLimitExceeded=output_limit_exceeded,
+        outputTruncated=stdout_sink.truncated or stderr_sink.truncated,
+        cpuTime=cpu_time,
+        wallTime=wall_time,
     )
 
 
+@dataclass
+class PreparedCode:
+    """Result of the compile step of ``execute_code_multiple``."""
+
+    file_path: Optional[Path] = None
+    error: Optional[str] = None  # 컴파일 오류 메시지
+
+
+async def prepare_code(
+    lang: SupportedLanguage, code: str, token: Optional[str], workdir: Path
+) -> PreparedCode:
+    """
+    Compile ``code`` into ``workdir``; compile errors are returned, not raised.
+    A ``SandboxError`` (the sandbox failed, not the code) is raised so the
+    worker retries the job.
+    """
+    try:
+        file_path = await compile_code(lang, code, token, workdir=workdir)
+    except (NotImplementedError, SandboxError):
+        raise
+    except Exception as e:
+        return PreparedCode(error=str(e))
+    logger.info(f"Compiled code for {lang} to {file_path}")
+    return PreparedCode(file_path=file_path)
+
+
 async def execute_code(
     lang: SupportedLanguage,
     code: str,
@@ -191,33 +422,39 @@ async def execute_code(
     token: Optional[str] = None,
 ) -> ExecutionResult:
     """High-level helper that compiles then executes code."""
-    try:
-        file_path = await compile_code(lang, code, token)
-    except NotImplementedError:
-        raise
-    except Exception as e:
-        return ExecutionResult(
-            requestId=str(uuid.uuid4()),
-            stdout="",
-            stderr=str(e),
-            exitCode=-1,
-            duration=0.0,
-            memoryUsed=0,
-            timedOut=False,
-        )
-
-    try:
-        result = await run_code(lang, file_path, stdin, time_limit, memory_limit)
-    finally:
+    with scratch_space().job() as workdir:
         try:
-            if lang is SupportedLanguage.java:
-                shutil.rmtree(file_path.parent, ignore_errors=True)
-            else:
-                os.remove(file_path)
-        except OSError:
-            pass
-
-    return result
+            file_path = await compile_code(lang, code, token, workdir=workdir)
+        except (NotImplementedError, SandboxError):
+            raise
+        except Exception as e:
+            return ExecutionResult(
+                requestId=str(uuid.uuid4()),
+                stdout="",
+                stderr=str(e),
+                exitCode=-1,
+                duration=0.0,
+                memoryUsed=0,
+                timedOut=False,
+            )
+
+        return await run_code(lang, file_path, stdin, time_limit, memory_limit)
+
+
+def _passed(res: ExecutionResult, expected: str) -> bool:
+    """Return True if ``res`` is an accepted answer for ``expected``."""
+    if res.outputMatched is not None:
+        matched = res.outputMatched
+    else:
+        matched = res.stdout.strip() == str(expected).strip()
+    return (
+        res.exitCode == 0
+        and not res.timedOut
+        and not res.outputLimitExceeded
+        and not res.memoryLimitExceeded
+        and res.stderr == ""
+        and matched
+    )
 
 
 async def execute_code_multiple(
@@ -232,86 +469,158 @@ async def execute_code_multiple(
     early_stop: bool = False,
     progress_cb: Optional[Callable[[ExecutionResult, int], Awaitable[None]]] = None,
     wall_time_limit: int | None = None,
+    parallelism: int = 1,
+    cpus: Optional[Sequence[Optional[int]]] = None,
+    prepared: Optional[PreparedCode] = None,
 ) -> list[ExecutionResult]:
     """
     Compile once and run the code for each stdin in ``stdins``.
 
     If ``early_stop`` is True and ``expected`` is provided, execution stops
     upon the first failed test case.
-    """
-    # if wall_time_limit is not None:
-    #     wall_time_limit = int(wall_time_limit * 0.2)
 
-    try:
-        file_path = await compile_code(lang, code, token)
-        logger.info(f"Compiled code for {lang} to {file_path}")
-    except NotImplementedError:
-        raise
-    except Exception as e:
-        err = ExecutionResult(
-            requestId=str(uuid.uuid4()),
-            stdout="",
-            stderr=str(e),
-            exitCode=-1,
-            duration=0.0,
-            memoryUsed=0,
-            timedOut=False,
-        )
-        return [err for _ in (stdins or [None])]
-
-    results: list[ExecutionResult] = []
-
-    # 여기서부터 실행 타이머 시작 (wall_time_limit용)! 
-    start = time.perf_counter()
-    try:
-        for idx, data in enumerate(stdins):
-            if wall_time_limit is not None:
-                elapsed = (time.perf_counter() - start) * 1000
-                remaining = wall_time_limit - elapsed
-                if remaining <= 0:
-                    res = ExecutionResult(
-                        requestId=str(uuid.uuid4()),
-                        stdout="",
-                        stderr="",
-                        exitCode=-9,
-                        duration=elapsed,
-                        memoryUsed=0,
-                        timedOut=True,
+    ``time_limit`` is the CPU time limit of each case. ``wall_time_limit`` is
+    a wall-clock budget for the whole job; each case also gets at most
+    ``time_limit * WALL_TIME_FACTOR`` ms of wall time.
+
+    Up to ``parallelism`` test cases run at once (bounded by the number of
+    ``cpus`` when given; lane ``i`` is pinned to ``cpus[i]``). Cases are
+    started in index order and the returned list is always in test-case
+    order. With ``early_stop``, a failure cancels every running case with a
+    higher index, so the result is the same prefix a sequential run would
+    produce. ``progress_cb`` is called in index order too: a finished case is
+    held back until every lower index has finished, so progress never
+    reports a case that the returned list later drops.
+
+    ``prepared`` is the output of ``prepare_code`` when the caller compiled
+    the code already (into a directory it owns); ``code`` is then ignored.
+    """
+    # 파이프라인에서 이미 컴파일했다면 산출물은 호출자의 디렉터리에 있으므로 작업 디렉터리를 새로 만들지 않는다.
+    with scratch_space().job() if prepared is None else contextlib.nullcontext() as workdir:
+        # if wall_time_limit is not None:
+        #     wall_time_limit = int(wall_time_limit * 0.2)
+
+        if prepared is None:
+            prepared = await prepare_code(lang, code, token, workdir)
+        file_path = prepared.file_path
+        if prepared.error is not None:
+            err = ExecutionResult(
+                requestId=str(uuid.uuid4()),
+                stdout="",
+                stderr=prepared.error,
+                exitCode=-1,
+                duration=0.0,
+                memoryUsed=0,
+                timedOut=False,
+            )
+            return [err for _ in (stdins or [None])]
+
+        lane_cpus: list[Optional[int]] = list(cpus) if cpus else [None]
+        lanes = max(1, min(parallelism, len(stdins) or 1))
+        if cpus:
+            lanes = min(lanes, len(lane_cpus))
+
+        results: dict[int, ExecutionResult] = {}
+        running: dict[int, asyncio.Task] = {}
+        stopped: set[int] = set()  # early stop으로 취소한 테스트케이스
+        stop_at = len(stdins)  # 이 인덱스부터는 실행하지 않는다
+        next_idx = 0
+        reported = 0  # 이 인덱스 앞까지 progress_cb로 보냈다
+        report_lock = asyncio.Lock()
+
+        async def _report() -> None:
+            # 앞선 케이스가 모두 끝난 결과만 순서대로 보낸다. 더 앞선 케이스가 실패하면 stop_at이 줄어 보내지 않는다.
+            nonlocal reported
+            if progress_cb is None:
+                return
+            async with report_lock:
+                while reported < stop_at and reported in results:
+                    await progress_cb(results[reported], reported)
+                    reported += 1
+
+        def _stop_after(idx: int) -> None:
+            nonlocal stop_at
+            stop_at = min(stop_at, idx + 1)
+            for i, task in running.items():
+                if i >= stop_at and not task.done():
+                    stopped.add(i)
+                    task.cancel()
+
+        async def _lane(cpu: Optional[int]) -> None:
+            nonlocal next_idx
+            while next_idx < stop_at:
+                idx = next_idx
+                next_idx += 1
+                if wall_time_limit is not None:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    remaining = wall_time_limit - elapsed
+                    if remaining <= 0:
+                        res = ExecutionResult(
+                            requestId=str(uuid.uuid4()),
+                            stdout="",
+                            stderr="",
+                            exitCode=-9,
+                            duration=0.0,
+                            memoryUsed=0,
+                            timedOut=True,
+                            wallTime=elapsed,
+                        )
+                        results[idx] = res
+                        _stop_after(idx)
+                        await _report()
+                        return
+                    case_wall = min(int(time_limit * WALL_TIME_FACTOR), int(remaining))
+                else:
+                    case_wall = None
+
+                case_expected = expected[idx] if expected and idx < len(expected) else None
+                task = asyncio.create_task(
+                    run_code(
+                        lang, file_path, stdins[idx], time_limit, memory_limit,
+                        cpu=cpu, expected=case_expected, wall_limit=case_wall, zygote=zygote,
                     )
-                    results.append(res)
-                    if progress_cb:
-                        await progress_cb(res, idx)
-                    break
-                case_limit = min(time_limit, int(remaining))
-            else:
-                case_limit = time_limit
-
-            res = await run_code(lang, file_path, data, case_limit, memory_limit)
-            results.append(res)
-            if progress_cb:
-                await progress_cb(res, idx)
-            if early_stop and expected and idx < len(expected):
-                passed = (
-                    res.exitCode == 0
-                    and not res.timedOut
-                    and res.stderr == ""
-                    and res.stdout.strip() == str(expected[idx]).strip()
                 )
-                if not passed:
-                    break
-
-            # Wall time limit 체크
-            if wall_time_limit is not None:
-                elapsed = (time.perf_counter() - start) * 1000
-                if elapsed > wall_time_limit:
-                    break
-    finally:
+                running[idx] = task
+                try:
+                    res = await task
+                except asyncio.CancelledError:
+                    if idx in stopped and task.cancelled():
+                        continue
+                    raise
+                finally:
+                    running.pop(idx, None)
+
+                if idx >= stop_at:  # 결과가 나오는 사이에 더 앞선 케이스가 실패함
+                    continue
+                results[idx] = res
+                if early_stop and expected and idx < len(expected):
+                    if not _passed(res, expected[idx]):
+                        _stop_after(idx)
+
+                # Wall time limit 체크
+                if wall_time_limit is not None:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    if elapsed > wall_time_limit:
+                        _stop_after(idx)
+                await _report()
+
+        zygote: Optional[PythonZygote] = None
+        if lang is SupportedLanguage.python and WARM_RUNTIME and _sandbox is None and len(stdins) > 1:
+            try:
+                # 컴파일 오류면 None: 일반 실행으로 같은 오류 메시지를 낸다.
+                # 제한 시간 안에 컴파일하지 못하면 zygote를 죽이고 일반 실행으로 돌아간다.
+                zygote = await PythonZygote.start(file_path, timeout=COMPILE_TIME_LIMIT_SECONDS)
+            except Exception as e:
+                logger.warning(f"Cannot start a warm runtime, running cold: {e}")
+
+        # 여기서부터 실행 타이머 시작 (wall_time_limit용)! 
+        start = time.perf_counter()
         try:
-            if lang is SupportedLanguage.java:
-                shutil.rmtree(file_path.parent, ignore_errors=True)
-            else:
-                os.remove(file_path)
-        except OSError:
-            pass
-
-    return results
+            await asyncio.gather(*(_lane(lane_cpus[i % len(lane_cpus)]) for i in range(lanes)))
+        finally:
+            for task in running.values():
+                task.cancel()
+            if zygote is not None:
+                await zygote.close()
+
+        return [results[i] for i in sorted(results) if i < stop_at]
@@ -0,0 +1,160 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import aio_pika
+
+from .pacing import PacingPolicy
+from .utils.logging_middleware_worker import ADMISSION_DELAY, LANE_JOBS_IN_FLIGHT, QUEUE_WAIT
+from .utils.rabbitmq_rpc_judge_api import EXECUTE_QUEUE, INTERACTIVE_QUEUE, PUBLISHED_AT_HEADER
+
+
+@dataclass(eq=False)
+class _Buffered:
+    message: aio_pika.abc.AbstractIncomingMessage
+    token: Optional[str]
+    deferred_at: Optional[float] = None  # 페이싱 때문에 처음 건너뛴 시각
+
+
+@dataclass
+class Lane:
+    """One execute queue consumed by the worker."""
+
+    name: str
+    queue: str
+    weight: int = 1
+    # 이 레인만 쓸 수 있도록 비워 두는 작업 자리 수
+    reserved: int = 0
+    in_flight: int = 0
+    _buffer: deque = field(default_factory=deque, init=False, repr=False)
+    _current: int = field(default=0, init=False, repr=False)
+
+
+class LaneScheduler:
+    """
+    Weighted-fair dispatch of messages from several execute queues.
+
+    Each lane's consumer only buffers messages; the scheduler starts at most
+    ``capacity`` jobs at once. When several lanes have messages waiting, the
+    next one comes from a smooth weighted round robin over them, so a lane of
+    weight 4 gets 4 of every 5 starts next to a lane of weight 1, and no lane
+    starves. ``reserved`` places of the capacity are kept free for a lane
+    while it has fewer jobs than that running.
+
+    With a ``pacing`` policy, a message whose token must still wait is
+    skipped and the next buffered message of another token starts instead;
+    it starts once its token's delay has passed. ``token_of`` reads the
+    token of a message.
+    """
+
+    def __init__(
+        self,
+        lanes: list[Lane],
+        capacity: int,
+        pacing: Optional[PacingPolicy] = None,
+        token_of: Callable[[aio_pika.abc.AbstractIncomingMessage], Optional[str]] = lambda message: None,
+    ):
+        self.lanes = lanes
+        self.capacity = max(capacity, sum(lane.reserved for lane in lanes) + 1)
+        self.pacing = pacing if pacing is not None and pacing.enabled else None
+        self.token_of = token_of
+        self._wake = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+        self._next_ready = math.inf
+
+    @property
+    def prefetch(self) -> int:
+        """Messages each lane should buffer: the capacity, plus room for messages held back by pacing."""
+        return self.capacity + (self.pacing.max_deferred if self.pacing else 0)
+
+    def put(self, lane: Lane, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        lane._buffer.append(_Buffered(message, self.token_of(message) if self.pacing else None))
+        self._wake.set()
+
+    def _ready(self, lane: Lane, now: float) -> Optional[_Buffered]:
+        """The oldest buffered message of ``lane`` whose token may start now."""
+        for item in lane._buffer:
+            delay = self.pacing.delay(item.token) if self.pacing else 0.0
+            if delay <= 0:
+                return item
+            if item.deferred_at is None:
+                item.deferred_at = now
+            self._next_ready = min(self._next_ready, delay)
+        return None
+
+    def _pick(self) -> Optional[tuple[Lane, _Buffered]]:
+        free = self.capacity - sum(lane.in_flight for lane in self.lanes)
+        now = time.monotonic()
+        eligible = []
+        for lane in self.lanes:
+            if not lane._buffer:
+                continue
+            held = sum(max(0, o.reserved - o.in_flight) for o in self.lanes if o is not lane)
+            if free - held > 0 and (item := self._ready(lane, now)) is not None:
+                eligible.append((lane, item))
+        if not eligible:
+            return None
+        total = sum(lane.weight for lane, _ in eligible)
+        for lane, _ in eligible:
+            lane._current += lane.weight
+        best = max(eligible, key=lambda picked: picked[0]._current)
+        best[0]._current -= total
+        return best
+
+    def _done(self, lane: Lane, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        lane.in_flight -= 1
+        LANE_JOBS_IN_FLIGHT.labels(lane=lane.name).set(lane.in_flight)
+        self._wake.set()
+
+    async def run(self, handler: Callable[[aio_pika.abc.AbstractIncomingMessage], Awaitable[None]]) -> None:
+        """Start ``handler`` for buffered messages as capacity allows (runs forever)."""
+        while True:
+            self._wake.clear()
+            self._next_ready = math.inf
+            while (picked := self._pick()) is not None:
+                lane, item = picked
+                lane._buffer.remove(item)
+                message = item.message
+                if self.pacing is not None:
+                    self.pacing.reserve(item.token)
+                    ADMISSION_DELAY.observe(time.monotonic() - item.deferred_at if item.deferred_at else 0.0)
+                published_at = (message.headers or {}).get(PUBLISHED_AT_HEADER)
+                if published_at is not None:
+                    QUEUE_WAIT.labels(lane=lane.name).observe(max(0.0, time.time() - float(published_at)))
+                lane.in_flight += 1
+                LANE_JOBS_IN_FLIGHT.labels(lane=lane.name).set(lane.in_flight)
+                task = asyncio.create_task(handler(message))
+                self._tasks.add(task)
+                task.add_done_callback(lambda t, lane=lane: self._done(lane, t))
+            # 페이싱으로 미룬 메시지가 있으면 가장 먼저 풀리는 시각에 다시 고른다.
+            try:
+                await asyncio.wait_for(self._wake.wait(), None if math.isinf(self._next_ready) else self._next_ready)
+            except asyncio.TimeoutError:
+                pass
+
+
+def lane_name(queue: Optional[str]) -> str:
+    """Metric label of the lane a message was consumed from."""
+    return "interactive" if queue == INTERACTIVE_QUEUE else "graded"
+
+
+def lanes_from_env() -> list[Lane]:
+    """The worker's lanes: ``interactive`` ahead of ``graded`` by ``LANE_WEIGHT_*``."""
+    return [
+        Lane(
+            name="interactive",
+            queue=INTERACTIVE_QUEUE,
+            weight=max(1, int(os.getenv("LANE_WEIGHT_INTERACTIVE", "4"))),
+            reserved=int(os.getenv("LANE_RESERVED_INTERACTIVE", "1")),
+        ),
+        Lane(
+            name="graded",
+            queue=EXECUTE_QUEUE,
+            weight=max(1, int(os.getenv("LANE_WEIGHT_GRADED", "1"))),
+        ),
+    ]
@@ -1,6 +1,8 @@
 import os
 import json
 import asyncio
+import time
+import uuid
 from typing import List, Dict, Set
 from enum import Enum
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
@@ -11,14 +13,31 @@ from pydantic import BaseModel
 from dotenv import load_dotenv
 from pathlib import Path
 import aioboto3
+from aiobotocore.config import AioConfig
 from botocore.exceptions import ClientError
+from contextlib import AsyncExitStack
 
 from .utils.logging_middleware_judge_api import (
-    logger
+    logger,
+    PROBLEM_FETCH_LATENCY,
 )
 
 from .executor import SupportedLanguage, ExecutionResult
-from .utils.rabbitmq_rpc_judge_api import RpcClient, get_rpc_client
+from .utils.rabbitmq_rpc_judge_api import (
+    EXECUTE_INTERACTIVE_LANE,
+    EXECUTE_QUEUE,
+    INTERACTIVE_QUEUE,
+    PublishError,
+    RpcClient,
+    execute_queue,
+    get_rpc_client,
+)
+from .utils.admission import Overloaded, admission_from_env
+from .utils.autoscale import capacity_estimator_from_env
+from .utils.meta_store import MetaStore, meta_store_from_env
+from .utils.circuit_breaker import CircuitBreaker
+from .utils.problem_cache import FetchedProblem, content_version, problem_cache_from_env
+from .utils.submission_dedup import submission_dedup_from_env, submission_key
 
 
 # Load ../.env relative to this file so it works regardless of cwd
@@ -31,6 +50,16 @@ AWS_REGION = os.getenv("AWS_REGION")
 AWS_PROBLEMS_BUCKET = os.getenv("AWS_PROBLEMS_BUCKET", "codeground-problems")
 AWS_PROBLEMS_BUCKET_PREFIX = os.getenv("AWS_PROBLEMS_BUCKET_PREFIX", "").strip("/")
 PROBLEMS_BUCKET_ENDPOINT = os.getenv("PROBLEMS_BUCKET_ENDPOINT")
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", "2"))
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "5"))
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "2"))
+S3_BREAKER_FAILURES = int(os.getenv("S3_BREAKER_FAILURES", "3"))
+S3_BREAKER_RESET_SECONDS = float(os.getenv("S3_BREAKER_RESET_SECONDS", "30"))
+PROBLEM_PRELOAD_IDS = [p.strip() for p in os.getenv("PROBLEM_PRELOAD_IDS", "").split(",") if p.strip()]
+PROBLEM_PRELOAD_PREFIX = os.getenv("PROBLEM_PRELOAD_PREFIX")
+PROBLEM_PRELOAD_CONCURRENCY = int(os.getenv("PROBLEM_PRELOAD_CONCURRENCY", "16"))
+TESTDATA_BY_REFERENCE = os.getenv("TESTDATA_BY_REFERENCE", "false").lower() in ("1", "true", "yes")
 SADPANDA_VALUE = os.getenv("SADPANDA", "")
 
 class CodeRequest(BaseModel):
@@ -40,12 +69,18 @@ class CodeRequest(BaseModel):
     timeLimit: int = 30000
     memoryLimit: int = 256
     token: str | None = None
+    parallelism: int | None = None
 
 class CodeV3Request(BaseModel):
     language: SupportedLanguage
     code: str
     problemId: str
     token: str | None = None
+    parallelism: int | None = None
+
+class ProblemPreloadRequest(BaseModel):
+    problemIds: List[str] = []
+    prefix: str | None = None
 
 class ResultStatus(str, Enum):
     SUCCESS = "success"
@@ -54,6 +89,8 @@ class ResultStatus(str, Enum):
     RUNTIME_EXCEPTION = "runtime_exception"
     WRONG_OUTPUT = "wrong_output"
     TIMEOUT = "timeout"
+    MEMORY_LIMIT_EXCEEDED = "memory_limit_exceeded"
+    OUTPUT_LIMIT_EXCEEDED = "output_limit_exceeded"
     FAILURE = "failure"
 
 app = FastAPI()
@@ -61,7 +98,7 @@ app.add_middleware(LoggingMiddleware)
 app.mount("/metrics", metrics_app)
 app.state.ws_connections: Dict[str, Set[WebSocket]] = {}
 app.state.progress_queue = None
-app.state.v3_meta: Dict[str, dict] = {}
+app.state.meta_store: MetaStore | None = None
 
 # CORS 설정
 # 기본 오리진 목록을 `.env`의 `CORS_ALLOW_ORIGINS`로 확장할 수 있다.
@@ -92,7 +129,19 @@ async def startup() -> None:
     url = os.getenv("RABBITMQ_URL", "asdf")
     logger.info(f"Connecting to RabbitMQ at {url}")
     app.state.rpc: RpcClient = await get_rpc_client()
-    app.state.progress_queue = await app.state.rpc.channel.declare_queue("progress", durable=True)
+    logger.info(f"API replica id: {app.state.rpc.replica_id}")
+    app.state.meta_store = meta_store_from_env()
+    app.state.dedup = submission_dedup_from_env()
+    app.state.admission = admission_from_env()
+    app.state.capacity = capacity_estimator_from_env()
+    app.state.rpc.on_published = app.state.capacity.arrived
+    await app.state.admission.start(
+        app.state.rpc.connection,
+        [EXECUTE_QUEUE, INTERACTIVE_QUEUE] if EXECUTE_INTERACTIVE_LANE else [EXECUTE_QUEUE],
+    )
+    app.state.progress_queue = app.state.rpc.progress_queue
+    # 구버전 워커가 발행하는 공용 `progress` 큐도 계속 소비한다.
+    app.state.legacy_progress_queue = await app.state.rpc.channel.declare_queue("progress", durable=True)
     if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY and AWS_REGION:
         app.state.s3_session = aioboto3.Session(
             aws_access_key_id=AWS_ACCESS_KEY_ID,
@@ -101,6 +150,26 @@ async def startup() -> None:
         )
     else:
         app.state.s3_session = None
+    # 앱 수명 동안 재사용하는 S3 클라이언트 (커넥션 풀 유지)
+    app.state.s3_stack = AsyncExitStack()
+    app.state.s3 = None
+    if app.state.s3_session:
+        app.state.s3 = await app.state.s3_stack.enter_async_context(
+            app.state.s3_session.client(
+                "s3",
+                region_name=AWS_REGION,
+                endpoint_url=PROBLEMS_BUCKET_ENDPOINT,
+                config=AioConfig(
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                    connect_timeout=S3_CONNECT_TIMEOUT,
+                    read_timeout=S3_READ_TIMEOUT,
+                    retries={"max_attempts": S3_MAX_ATTEMPTS},
+                ),
+            )
+        )
+    app.state.s3_breaker = CircuitBreaker(
+        "s3", failure_threshold=S3_BREAKER_FAILURES, reset_timeout=S3_BREAKER_RESET_SECONDS
+    )
     app.state.aws_region = AWS_REGION
     app.state.problems_bucket = AWS_PROBLEMS_BUCKET
     prefix = AWS_PROBLEMS_BUCKET_PREFIX.strip("/")
@@ -111,62 +180,214 @@ async def startup() -> None:
         / "static"
         / app.state.problems_bucket
     )
-    asyncio.create_task(progress_consumer())
+    app.state.problem_cache = problem_cache_from_env(_load_problem)
+    if PROBLEM_PRELOAD_IDS or PROBLEM_PRELOAD_PREFIX is not None:
+        ids = PROBLEM_PRELOAD_IDS + (
+            await _list_problem_ids(PROBLEM_PRELOAD_PREFIX) if PROBLEM_PRELOAD_PREFIX is not None else []
+        )
+        summary = await _preload_problems(ids)
+        logger.info(f"Preloaded {len(summary['loaded'])} problem(s), {len(summary['failed'])} failed")
+    asyncio.create_task(progress_consumer(app.state.progress_queue))
+    asyncio.create_task(progress_consumer(app.state.legacy_progress_queue))
 
 
 @app.on_event("shutdown")
 async def shutdown() -> None:
+    await app.state.admission.close()
     await app.state.rpc.close()
+    await app.state.meta_store.close()
+    await app.state.s3_stack.aclose()
+
 
+async def _load_problem(problem_id: str, etag: str | None = None) -> FetchedProblem | None:
+    """
+    Load a problem definition from S3 if possible, otherwise from local files.
 
-async def _fetch_problem(problem_id: str) -> dict:
-    """Load a problem definition from S3 if possible, otherwise from local files."""
+    If ``etag`` still matches the stored object, returns None (not modified).
+    """
     # key = f"{app.state.problems_prefix}{problem_id}.json"
     key = f"{app.state.problems_prefix}{problem_id}"
-    if app.state.s3_session:
-        logger.info(f"app.state.s3_session=True, Attempting to fetch problem {key} from AWS S3" )
+    s3 = app.state.s3
+    breaker = app.state.s3_breaker
+    if s3 is not None and breaker.allow():
+        logger.info(f"S3 client available, attempting to fetch problem {key} from AWS S3")
+        start = time.perf_counter()
+        body = None
         try:
-            async with app.state.s3_session.client(
-                "s3",
-                region_name=app.state.aws_region,
-                endpoint_url=app.state.problems_endpoint,
-            ) as s3:
-                obj = await s3.get_object(
-                    Bucket=app.state.problems_bucket,
-                    Key=key,
-                )
-                body = await obj["Body"].read()
-                logger.info(f"Fetched problem {problem_id}, now parsing JSON")
-                return json.loads(body)
+            params = {"Bucket": app.state.problems_bucket, "Key": key}
+            if etag and not etag.startswith("local:"):
+                params["IfNoneMatch"] = etag
+            obj = await s3.get_object(**params)
+            body = await obj["Body"].read()
+            breaker.record_success()
         except ClientError as e:
-            if e.response.get("Error", {}).get("Code") == "NoSuchKey":
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("304", "NotModified"):
+                breaker.record_success()
+                PROBLEM_FETCH_LATENCY.labels(source="s3").observe(time.perf_counter() - start)
+                return None
+            if code == "NoSuchKey":
+                breaker.record_success()
                 raise HTTPException(status_code=404, detail=f"Problem {problem_id} not found")
             # Any other error will fall back to local files
+            breaker.record_failure()
             logger.error(f"ClientError details: {e}")
         except Exception as ex:
+            breaker.record_failure()
             logger.error(f"Exception details: {ex}")
+        finally:
+            # 취소되어 성공/실패를 기록하지 못한 시험 호출(half-open)의 자리를 돌려준다.
+            breaker.release()
+        if body is not None:
+            logger.info(f"Fetched problem {problem_id}, now parsing JSON")
+            PROBLEM_FETCH_LATENCY.labels(source="s3").observe(time.perf_counter() - start)
+            # 파싱 오류는 S3 장애가 아니므로 차단기 밖에서 처리하고, 로컬 파일로 대신한다.
+            try:
+                return FetchedProblem(
+                    problem=json.loads(body),
+                    size=len(body),
+                    version=content_version(body),
+                    etag=obj.get("ETag"),
+                )
+            except ValueError as ex:
+                logger.error(f"Problem {key} from S3 is not valid JSON: {ex}")
+    elif s3 is not None:
+        logger.info(f"S3 circuit breaker is open, skipping S3 for problem {problem_id}")
 
     # Fallback to local files
-    logger.info(f"app.state.s3_session=False, Fetching problem {problem_id} from local files")
+    logger.info(f"Fetching problem {problem_id} from local files")
     path = app.state.problems_local_dir / key
+    start = time.perf_counter()
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        st = path.stat()
+        local_etag = f"local:{st.st_mtime_ns}:{st.st_size}"
+        if etag == local_etag:
+            return None
+        body = path.read_bytes()
+        PROBLEM_FETCH_LATENCY.labels(source="local").observe(time.perf_counter() - start)
+        return FetchedProblem(
+            problem=json.loads(body),
+            size=len(body),
+            version=content_version(body),
+            etag=local_etag,
+        )
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Problem {problem_id} not found")
     except Exception:
         raise HTTPException(status_code=500, detail=f"Failed to fetch the problem {problem_id}")
 
+
+async def _list_problem_ids(prefix: str = "") -> list[str]:
+    """List problem ids (JSON file names) under ``prefix`` in S3, or in the local directory."""
+    if app.state.s3 is not None and app.state.s3_breaker.allow():
+        try:
+            ids = []
+            paginator = app.state.s3.get_paginator("list_objects_v2")
+            async for page in paginator.paginate(
+                Bucket=app.state.problems_bucket,
+                Prefix=f"{app.state.problems_prefix}{prefix}",
+            ):
+                for obj in page.get("Contents", []):
+                    ids.append(obj["Key"][len(app.state.problems_prefix):])
+            app.state.s3_breaker.record_success()
+            return ids
+        except Exception as ex:
+            app.state.s3_breaker.record_failure()
+            logger.error(f"Failed to list problems in S3, falling back to local files: {ex}")
+        finally:
+            app.state.s3_breaker.release()
+    local_dir = app.state.problems_local_dir
+    return sorted(
+        str(p.relative_to(local_dir))
+        for p in local_dir.rglob("*")
+        if p.is_file() and str(p.relative_to(local_dir)).startswith(prefix)
+    )
+
+
+async def _preload_problems(problem_ids: list[str], refresh: bool = False) -> dict:
+    """Load (or revalidate) problems into the cache with bounded parallelism."""
+    sem = asyncio.Semaphore(PROBLEM_PRELOAD_CONCURRENCY)
+    cache = app.state.problem_cache
+    loaded: list[str] = []
+    failed: dict[str, str] = {}
+
+    async def _one(problem_id: str) -> None:
+        async with sem:
+            try:
+                if refresh:
+                    await cache.refresh(problem_id)
+                else:
+                    await cache.get(problem_id)
+                loaded.append(problem_id)
+            except HTTPException as e:
+                failed[problem_id] = str(e.detail)
+            except Exception as e:
+                failed[problem_id] = str(e)
+
+    await asyncio.gather(*(_one(pid) for pid in dict.fromkeys(problem_ids)))
+    return {"loaded": sorted(loaded), "failed": failed}
+
+
+async def _fetch_problem(problem_id: str) -> FetchedProblem:
+    """Return a problem definition (and its content version) through the in-process problem cache."""
+    return await app.state.problem_cache.get(problem_id)
+
+
+def _test_data_fields(
+    problem_id: str,
+    fetched: FetchedProblem,
+    stdins: list[str],
+    expected: list[str],
+    cases: list[int] | None = None,
+) -> dict:
+    """
+    Return the test data part of an ``execute`` payload.
+
+    With ``TESTDATA_BY_REFERENCE`` the message only names the problem, its
+    content version and the selected test case indices (``None`` = all); the
+    worker loads the data from its local test data cache.
+    """
+    if TESTDATA_BY_REFERENCE:
+        return {"testData": {"problemId": problem_id, "version": fetched.version, "cases": cases}}
+    return {"stdins": stdins, "expected": expected}
+
+def _test_case_parallelism(problem: dict, requested: int | None) -> int | None:
+    """
+    Decide how many test cases may run at once for a problem.
+
+    ``test_case_parallelism`` in the problem definition is an upper bound, so
+    timing-sensitive problems can opt out with ``1``. ``None`` leaves the
+    choice to the worker's default.
+    """
+    limit = problem.get("test_case_parallelism")
+    if limit is None:
+        return requested
+    limit = max(1, int(limit))
+    return min(requested, limit) if requested else limit
+
+
 def _result_status(res: ExecutionResult, expected: str) -> ResultStatus:
     if res.exitCode == -1 and res.stderr:
         return ResultStatus.COMPILE_ERROR
     if res.timedOut:
         return ResultStatus.TIMEOUT
+    if res.memoryLimitExceeded:
+        return ResultStatus.MEMORY_LIMIT_EXCEEDED
+    if res.outputLimitExceeded:
+        return ResultStatus.OUTPUT_LIMIT_EXCEEDED
+    if res.stoppedOnMismatch:
+        # 출력이 어긋나는 즉시 워커가 프로세스를 종료한 경우
+        return ResultStatus.WRONG_OUTPUT
     if "SyntaxError:" in res.stderr:
         return ResultStatus.SYNTAX_ERROR
     if res.exitCode != 0:
         return ResultStatus.RUNTIME_EXCEPTION
-    if res.exitCode == 0 and res.stderr == "" and res.stdout.strip() == str(expected).strip():
+    # 워커가 스트리밍으로 비교한 결과가 있으면 그것을 쓴다 (stdout은 앞부분만 올 수 있음).
+    if res.outputMatched is not None:
+        matched = res.outputMatched
+    else:
+        matched = res.stdout.strip() == str(expected).strip()
+    if res.exitCode == 0 and res.stderr == "" and matched:
         return ResultStatus.SUCCESS
     if res.exitCode == 0 and res.stderr == "":
         return ResultStatus.WRONG_OUTPUT
@@ -211,6 +432,7 @@ def _prepare_final(meta: dict, results: List[ExecutionResult]) -> dict:
             "expected": exp,
             "exitCode": res.exitCode,
             "duration": res.duration,
+            "wallTime": res.wallTime,
             "memoryUsed": res.memoryUsed,
             "timedOut": res.timedOut,
         }
@@ -229,12 +451,165 @@ def _prepare_final(meta: dict, results: List[ExecutionResult]) -> dict:
         "total": meta["total"],
     }
 
+async def _submit(
+    req: CodeV3Request,
+    fetched: FetchedProblem,
+    payload: dict,
+    meta: dict,
+    cases: list[int] | None = None,
+    interactive: bool = False,
+) -> dict:
+    """
+    Start grading ``req`` and return its ``requestId``.
+
+    A submission identical to a recent one (same code, language, problem
+    content version and test cases) is graded from the cached results and
+    also gets its ``final`` message in the response. One identical to a
+    running job is attached to that job instead of being published again.
+    Problems with ``"verdict_cache": false`` are never served from the cache.
+    """
+    request_id = str(uuid.uuid4())
+    key = submission_key(req.language.value, req.code, req.problemId, fetched.version, cases)
+    dedup = app.state.dedup
+    cacheable = fetched.problem.get("verdict_cache", True) is not False
+    cached = dedup.cached(key) if cacheable else None
+    if cached is not None:
+        final = _prepare_final(meta, [ExecutionResult(**r) for r in cached])
+        dedup.hold(request_id, final)
+        return {"requestId": request_id, "cached": True, "final": final}
+
+    # 실행 중인 같은 작업에 합쳐질 제출은 워커 용량을 쓰지 않으므로 부하 제한을 적용하지 않는다.
+    # 자리는 await 전에 잡아 둔다. 확인과 등록 사이에 다른 제출이 끼어들면 한도를 넘을 수 있다.
+    admission = app.state.admission
+    if not dedup.running(key):
+        try:
+            admission.reserve(request_id, req.token, execute_queue(interactive))
+        except Overloaded as e:
+            raise HTTPException(
+                status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)}
+            )
+
+    if "testData" in payload:
+        # 워커가 참조한 버전을 구하지 못하면 테스트 데이터를 직접 실어 다시 보낼 수 있도록 남겨 둔다.
+        meta = {**meta, "resend": {
+            "payload": {k: v for k, v in payload.items() if k != "testData"},
+            "testData": payload["testData"],
+            "interactive": interactive,
+        }}
+
+    # 워커의 첫 progress 메시지보다 메타데이터가 먼저 저장되도록 ID를 미리 만든다.
+    try:
+        await app.state.meta_store.set(request_id, meta)
+    except BaseException:
+        admission.finished(request_id, completed=False)
+        raise
+    if dedup.join(key, request_id, cacheable) is not None:
+        # 기다리는 사이 같은 작업이 시작되어 합쳐졌다: 잡아 둔 자리를 돌려준다.
+        admission.finished(request_id, completed=False)
+    else:
+        # 합쳐질 예정이었는데 그 사이 앞 작업이 끝났다면 여기서 센다 (자리를 이미 잡았다면 그대로).
+        if request_id not in admission:
+            admission.started(request_id, req.token)
+        try:
+            await app.state.rpc.send(payload, correlation_id=request_id, interactive=interactive)
+        except PublishError as e:
+            admission.finished(request_id, completed=False)
+            # 발행을 기다리는 사이에 합쳐진 제출들에도 실패를 알린다.
+            for follower in dedup.finish(request_id, None):
+                await app.state.meta_store.pop(follower)
+                await _send_ws(follower, {"type": "final", "results": [], "error": str(e)})
+            await app.state.meta_store.pop(request_id)
+            raise
+    return {"requestId": request_id}
+
+
+async def _resend_inline(rid: str) -> bool:
+    """
+    Publish job ``rid`` again with its test data inline, after a worker could
+    not get the content version it referenced (e.g. this replica's problem
+    cache had not seen an update yet). False if this replica no longer has
+    that version either; the job then fails with the worker's error.
+    """
+    meta = await app.state.meta_store.get(rid)
+    resend = meta.get("resend") if meta else None
+    if not resend:
+        return False
+    ref = resend["testData"]
+    try:
+        fetched = await _fetch_problem(ref["problemId"])
+    except HTTPException:
+        return False
+    # 다음 제출부터는 최신 내용을 보도록 다시 검증하게 한다.
+    app.state.problem_cache.invalidate(ref["problemId"])
+    if fetched.version != ref["version"]:
+        return False
+    test_cases = fetched.problem.get("test_cases", [])
+    indices = range(len(test_cases)) if ref["cases"] is None else ref["cases"]
+    payload = {
+        **resend["payload"],
+        "stdins": [test_cases[i].get("input", "") for i in indices],
+        "expected": [test_cases[i].get("output", "") for i in indices],
+    }
+    try:
+        await app.state.rpc.send(payload, correlation_id=rid, interactive=resend["interactive"])
+    except PublishError:
+        return False
+    logger.warning(f"Resent {rid} with inline test data: version {ref['version']} is not available to workers")
+    return True
+
+
 def _check_sadpanda(request: Request) -> None:
     if request.cookies.get("sadpanda") != SADPANDA_VALUE:
         raise HTTPException(status_code=400, detail="Bad request")
 
-async def progress_consumer() -> None:
-    queue = app.state.progress_queue
+async def _send_ws(rid: str, data: dict) -> None:
+    conns = app.state.ws_connections.get(rid)
+    if conns:
+        to_remove = set()
+        for ws in conns:
+            try:
+                await ws.send_json(data)
+            except Exception:
+                to_remove.add(ws)
+        conns.difference_update(to_remove)
+        if data.get("type") == "final":
+            app.state.ws_connections.pop(rid, None)
+
+
+def _expand_progress_batch(data: dict) -> List[dict]:
+    """Turn a worker's ``progress_batch`` frame into the ``progress`` messages clients expect."""
+    return [
+        {"type": "progress", "index": item["index"], "result": item["result"], "completed": data["completed"]}
+        for item in data.get("items", [])
+    ]
+
+
+async def _deliver(rid: str, data: dict) -> None:
+    """Grade a worker message with the metadata of ``rid`` and send it to its WebSockets."""
+    kind = data.get("type")
+    if kind in ("progress", "progress_batch") and not app.state.ws_connections.get(rid):
+        return
+    if kind == "progress_batch":
+        # 워커가 여러 테스트케이스 결과를 묶어 보낸 경우: 메타데이터는 한 번만 읽는다.
+        meta = await app.state.meta_store.get(rid)
+        for item in _expand_progress_batch(data):
+            if meta is not None:
+                item = _apply_progress(item, meta)
+            await _send_ws(rid, item)
+        return
+    if kind == "progress":
+        meta = await app.state.meta_store.get(rid)
+        if meta is not None:
+            data = _apply_progress(data, meta)
+    if kind == "final":
+        meta = await app.state.meta_store.pop(rid)
+        if meta is not None:
+            results = [ExecutionResult(**r) for r in data["results"]]
+            data = _prepare_final(meta, results)
+    await _send_ws(rid, data)
+
+
+async def progress_consumer(queue) -> None:
     async with queue.iterator() as it:
         async for message in it:
             async with message.process():
@@ -242,25 +617,51 @@ async def progress_consumer() -> None:
                 if not rid:
                     continue
                 data = json.loads(message.body)
-                if data.get("type") == "progress" and rid in app.state.v3_meta:
-                    meta = app.state.v3_meta[rid]
-                    data = _apply_progress(data, meta)
-                if data.get("type") == "final" and rid in app.state.v3_meta:
-                    meta = app.state.v3_meta.pop(rid)
-                    results = [ExecutionResult(**r) for r in data["results"]]
-                    data = _prepare_final(meta, results)
-
-                conns = app.state.ws_connections.get(rid)
-                if conns:
-                    to_remove = set()
-                    for ws in conns:
-                        try:
-                            await ws.send_json(data)
-                        except Exception:
-                            to_remove.add(ws)
-                    conns.difference_update(to_remove)
-                    if data.get("type") == "final":
-                        app.state.ws_connections.pop(rid, None)
+                # 같은 작업에 합쳐진 제출(follower)에도 각자의 메타데이터로 채점해 보낸다.
+                if data.get("type") == "final":
+                    if data.get("testDataStale") and await _resend_inline(rid):
+                        continue
+                    app.state.admission.finished(rid)
+                    app.state.capacity.completed(data.get("timing"))
+                    raw = None if data.get("error") else data.get("results")
+                    targets = [rid, *app.state.dedup.finish(rid, raw)]
+                else:
+                    targets = [rid, *app.state.dedup.followers(rid)]
+                for target in targets:
+                    # _apply_progress가 메시지를 고치므로 대상마다 복사본을 쓴다.
+                    await _deliver(target, json.loads(message.body) if target != rid else data)
+
+
+# 오토스케일러용: 현재 도착률과 작업당 처리 시간으로 계산한 권장 워커 수
+@app.get("/autoscale")
+async def autoscale():
+    return {
+        "replica": app.state.rpc.replica_id,
+        **app.state.capacity.recommend(app.state.admission.in_flight),
+    }
+
+
+# 관리자용: 대회 시작 전에 문제들을 미리 캐시에 올려 둔다.
+@app.post("/admin/problems/preload")
+async def preload_problems(req: ProblemPreloadRequest, request: Request):
+    _check_sadpanda(request)
+    ids = list(req.problemIds)
+    if req.prefix is not None:
+        ids += await _list_problem_ids(req.prefix)
+    return await _preload_problems(ids)
+
+
+# 관리자용: 대회 중 테스트케이스가 바뀌었을 때 캐시된 문제들을 다시 검증한다.
+# problemIds와 prefix가 모두 비어 있으면 캐시에 있는 모든 문제를 대상으로 한다.
+@app.post("/admin/problems/refresh")
+async def refresh_problems(req: ProblemPreloadRequest, request: Request):
+    _check_sadpanda(request)
+    ids = list(req.problemIds)
+    if req.prefix is not None:
+        ids += await _list_problem_ids(req.prefix)
+    if not req.problemIds and req.prefix is None:
+        ids = app.state.problem_cache.cached_ids()
+    return await _preload_problems(ids, refresh=True)
 
 
 # 이 함수는 debug용으로, 프로덕션에서는 사용하지 않습니다.
@@ -270,9 +671,12 @@ async def run_code(req: CodeRequest, request: Request):
     _check_sadpanda(request)
     try:
         payload = req.dict()
-        raw_results = await app.state.rpc.call(payload)
+        # 디버그용 동기 실행과 임의 입력 실행은 사용자가 바로 기다리므로 interactive 레인으로 보낸다.
+        raw_results = await app.state.rpc.call(payload, interactive=True)
         results = [ExecutionResult(**r) for r in raw_results]
         return results
+    except PublishError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except NotImplementedError as e:
         raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
@@ -286,8 +690,10 @@ async def run_code_v2(req: CodeRequest, request: Request):
     _check_sadpanda(request)
     try:
         payload = req.dict()
-        request_id = await app.state.rpc.send(payload)
+        request_id = await app.state.rpc.send(payload, interactive=True)
         return {"requestId": request_id}
+    except PublishError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except NotImplementedError as e:
         raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
@@ -298,6 +704,10 @@ async def ws_progress(websocket: WebSocket, request_id: str):
     await websocket.accept()
     conns = app.state.ws_connections.setdefault(request_id, set())
     conns.add(websocket)
+    # 캐시된 결과로 이미 채점이 끝난 요청이면 final을 바로 보낸다.
+    final = app.state.dedup.take(request_id)
+    if final is not None:
+        await _send_ws(request_id, final)
     try:
         while True:
             await websocket.receive_text()
@@ -314,7 +724,8 @@ async def ws_progress(websocket: WebSocket, request_id: str):
 async def run_code_v3(req: CodeV3Request, request: Request):
     _check_sadpanda(request)
     try:
-        problem = await _fetch_problem(req.problemId)
+        fetched = await _fetch_problem(req.problemId)
+        problem = fetched.problem
 
         if req.language.value not in problem.get("languages", []):
             raise HTTPException(status_code=400, detail="Language not allowed")
@@ -333,27 +744,26 @@ async def run_code_v3(req: CodeV3Request, request: Request):
         payload = {
             "language": req.language,
             "code": req.code,
-            "stdins": stdins,
             "timeLimit": time_limit,
             "wallTimeLimit": time_limit,
             "memoryLimit": memory_limit,
             "token": req.token,
-            "expected": expected,
             "earlyStop": True,
+            "parallelism": _test_case_parallelism(problem, req.parallelism),
+            **_test_data_fields(req.problemId, fetched, stdins, expected),
         }
 
-        request_id = await app.state.rpc.send(payload)
-        app.state.v3_meta[request_id] = {
+        return await _submit(req, fetched, payload, {
             "expected": expected,
             "tc_meta": tc_meta,
             "problemId": req.problemId,
             "total": len(stdins),
-        }
-
-        return {"requestId": request_id}
+        })
 
     except HTTPException:
         raise
+    except PublishError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except NotImplementedError as e:
         raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
@@ -365,7 +775,8 @@ async def run_code_v3(req: CodeV3Request, request: Request):
 @app.post("/execute_v4")
 async def run_code_v4(req: CodeV3Request):
     try:
-        problem = await _fetch_problem(req.problemId)
+        fetched = await _fetch_problem(req.problemId)
+        problem = fetched.problem
 
         if req.language.value not in problem.get("languages", []):
             raise HTTPException(status_code=400, detail="Language not allowed")
@@ -384,28 +795,27 @@ async def run_code_v4(req: CodeV3Request):
         payload = {
             "language": req.language,
             "code": req.code,
-            "stdins": stdins,
             "timeLimit": time_limit,
             "wallTimeLimit": time_limit,
             "memoryLimit": memory_limit,
             "token": req.token,
-            "expected": expected,
             "earlyStop": True,
+            "parallelism": _test_case_parallelism(problem, req.parallelism),
+            **_test_data_fields(req.problemId, fetched, stdins, expected),
         }
 
-        request_id = await app.state.rpc.send(payload)
-        app.state.v3_meta[request_id] = {
+        return await _submit(req, fetched, payload, {
             "expected": expected,
             "tc_meta": tc_meta,
             "problemId": req.problemId,
             "total": len(stdins),
             "hide_output": True,
-        }
-
-        return {"requestId": request_id}
+        })
 
     except HTTPException:
         raise
+    except PublishError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except NotImplementedError as e:
         raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
@@ -417,7 +827,8 @@ async def run_code_v4(req: CodeV3Request):
 @app.post("/execute_v4_public")
 async def run_code_v4_public(req: CodeV3Request):
     try:
-        problem = await _fetch_problem(req.problemId)
+        fetched = await _fetch_problem(req.problemId)
+        problem = fetched.problem
 
         if req.language.value not in problem.get("languages", []):
             raise HTTPException(status_code=400, detail="Language not allowed")
@@ -426,10 +837,11 @@ async def run_code_v4_public(req: CodeV3Request):
         mem_kb = int(problem.get("memory_limit_kilobytes", 262144))
         memory_limit = mem_kb // 1024
 
-        cases = [       # 필터링된 공개 테스트케이스만 가져오기
-            tc for tc in problem.get("test_cases", [])
+        case_indices = [       # 필터링된 공개 테스트케이스만 가져오기
+            i for i, tc in enumerate(problem.get("test_cases", []))
             if tc.get("visibility", "public") == "public"
         ]
+        cases = [problem["test_cases"][i] for i in case_indices]
         stdins = [tc.get("input", "") for tc in cases]
         expected = [tc.get("output", "") for tc in cases]
         tc_meta = [
@@ -440,28 +852,28 @@ async def run_code_v4_public(req: CodeV3Request):
         payload = {
             "language": req.language,
             "code": req.code,
-            "stdins": stdins,
             "timeLimit": time_limit,
             "wallTimeLimit": time_limit,
             "memoryLimit": memory_limit,
             "token": req.token,
-            "expected": expected,
             "earlyStop": True,
+            "parallelism": _test_case_parallelism(problem, req.parallelism),
+            **_test_data_fields(req.problemId, fetched, stdins, expected, case_indices),
         }
 
-        request_id = await app.state.rpc.send(payload)
-        app.state.v3_meta[request_id] = {
+        # 공개 테스트케이스만 돌리는 짧은 실행: 긴 채점 제출 뒤에 줄 서지 않도록 interactive 레인으로 보낸다.
+        return await _submit(req, fetched, payload, {
             "expected": expected,
             "tc_meta": tc_meta,
             "problemId": req.problemId,
             "total": len(stdins),
             "hide_output": True,
-        }
-
-        return {"requestId": request_id}
+        }, cases=case_indices, interactive=True)
 
     except HTTPException:
         raise
+    except PublishError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except NotImplementedError as e:
         raise HTTPException(status_code=501, detail=str(e))
     except Exception as e:
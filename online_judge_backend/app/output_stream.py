@@ -0,0 +1,79 @@
+import codecs
+from typing import Optional
+
+
+class StreamingMatcher:
+    """
+    Incremental equivalent of ``output.strip() == expected.strip()``.
+
+    Output is fed in decoded chunks. Leading whitespace is skipped, the rest
+    must match the stripped expected text exactly and may only be followed by
+    whitespace. ``diverged`` becomes True as soon as no continuation of the
+    output can match any more.
+    """
+
+    def __init__(self, expected: str):
+        self.expected = str(expected).strip()
+        self.pos = 0
+        self.started = False
+        self.diverged = False
+
+    def feed(self, text: str) -> None:
+        if self.diverged or not text:
+            return
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return
+            self.started = True
+        if self.pos < len(self.expected):
+            n = min(len(text), len(self.expected) - self.pos)
+            if text[:n] != self.expected[self.pos:self.pos + n]:
+                self.diverged = True
+                return
+            self.pos += n
+            text = text[n:]
+        # 기대 출력이 모두 나온 뒤에는 공백만 허용된다.
+        if text and not text.isspace():
+            self.diverged = True
+
+    @property
+    def matched(self) -> bool:
+        return not self.diverged and self.pos == len(self.expected)
+
+
+class OutputSink:
+    """
+    Consumes one output stream of a running program.
+
+    Only the first ``keep_bytes`` bytes are kept for reporting; the total size
+    is still counted and, if ``expected`` is given, every byte is checked by a
+    ``StreamingMatcher``.
+    """
+
+    def __init__(self, keep_bytes: int, expected: Optional[str] = None):
+        self.keep_bytes = keep_bytes
+        self.total = 0
+        self._kept = bytearray()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.matcher = StreamingMatcher(expected) if expected is not None else None
+
+    def feed(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        room = self.keep_bytes - len(self._kept)
+        if room > 0:
+            self._kept += chunk[:room]
+        if self.matcher and not self.matcher.diverged:
+            self.matcher.feed(self._decoder.decode(chunk))
+
+    def close(self) -> None:
+        if self.matcher and not self.matcher.diverged:
+            self.matcher.feed(self._decoder.decode(b"", final=True))
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self._kept)
+
+    @property
+    def text(self) -> str:
+        return self._kept.decode(errors="replace")
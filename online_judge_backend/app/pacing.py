@@ -0,0 +1,109 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class _TokenState:
+    tokens: float
+    updated: float
+    cooldown_until: float = 0.0
+
+
+@dataclass
+class PacingPolicy:
+    """
+    Admission policy applied before a job is allowed to run.
+
+    - ``rate``/``burst``: per-token token bucket (jobs per second). ``rate <= 0``
+      disables rate limiting.
+    - ``heavy_job_seconds``/``cooldown_seconds``: after a job of one token ran
+      longer than ``heavy_job_seconds``, that token's next job waits until
+      ``cooldown_seconds`` have passed since it finished.
+
+    The worker's ``LaneScheduler`` applies the policy when it picks the next
+    message: a message whose token must wait stays buffered (``delay``) and
+    other tokens' messages start first, so waiting jobs never hold a job
+    place. Up to ``max_deferred`` such messages are buffered per lane on top
+    of the places.
+    """
+
+    rate: float = 0.0
+    burst: float = 1.0
+    heavy_job_seconds: float = 0.0
+    cooldown_seconds: float = 0.0
+    max_deferred: int = 32
+    max_tracked_tokens: int = 10000
+    _states: dict[str, _TokenState] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or (self.heavy_job_seconds > 0 and self.cooldown_seconds > 0)
+
+    def _state(self, key: str, now: float) -> _TokenState:
+        state = self._states.get(key)
+        if state is None:
+            if len(self._states) >= self.max_tracked_tokens:
+                self._prune(now)
+            state = self._states[key] = _TokenState(tokens=self.burst, updated=now)
+        return state
+
+    def _prune(self, now: float) -> None:
+        """Forget tokens whose bucket is full again and that are not cooling down."""
+        for key, state in list(self._states.items()):
+            refilled = state.tokens + (now - state.updated) * self.rate if self.rate > 0 else self.burst
+            if refilled >= self.burst and state.cooldown_until <= now:
+                del self._states[key]
+
+    def delay(self, token: Optional[str]) -> float:
+        """Seconds until ``token`` may start a job, without reserving it."""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        state = self._states.get(token or "")
+        if state is None:
+            return 0.0
+        delay = max(0.0, state.cooldown_until - now)
+        if self.rate > 0:
+            tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+            if tokens < 1:
+                delay = max(delay, (1 - tokens) / self.rate)
+        return delay
+
+    def reserve(self, token: Optional[str]) -> float:
+        """Reserve a run for ``token`` and return how many seconds it must wait."""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        state = self._state(token or "", now)
+        delay = max(0.0, state.cooldown_until - now)
+        if self.rate > 0:
+            state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+            state.updated = now
+            # 토큰을 미리 차감(음수 허용)하여 대기 중인 요청끼리도 순서대로 간격이 벌어지게 한다.
+            state.tokens -= 1
+            if state.tokens < 0:
+                delay = max(delay, -state.tokens / self.rate)
+        return delay
+
+    def record(self, token: Optional[str], duration: float) -> None:
+        """Record a finished job so heavy jobs trigger the cooldown."""
+        if self.heavy_job_seconds <= 0 or self.cooldown_seconds <= 0:
+            return
+        if duration < self.heavy_job_seconds:
+            return
+        now = time.monotonic()
+        state = self._state(token or "", now)
+        state.cooldown_until = max(state.cooldown_until, now + self.cooldown_seconds)
+
+
+def pacing_from_env() -> PacingPolicy:
+    """Build the worker's pacing policy from ``PACING_*`` environment variables."""
+    return PacingPolicy(
+        rate=float(os.getenv("PACING_TOKEN_RATE", "0")),
+        burst=float(os.getenv("PACING_TOKEN_BURST", "1")),
+        heavy_job_seconds=float(os.getenv("PACING_HEAVY_JOB_SECONDS", "0")),
+        cooldown_seconds=float(os.getenv("PACING_COOLDOWN_SECONDS", "0")),
+        max_deferred=int(os.getenv("PACING_MAX_DEFERRED", "32")),
+    )
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from .utils.logging_middleware_worker import STAGE_DURATION, STAGE_QUEUE_DEPTH, STAGE_WAIT
+
+T = TypeVar("T")
+
+
+class HandOff:
+    """
+    A compiled job holding a place in the queue between the two stages.
+
+    Also carries how long the job spent in the compile stage: waiting for a
+    compile slot (``compile_wait``), compiling (``compile_time``) and waiting
+    for a place in the queue (``handoff_wait``), all in seconds.
+    """
+
+    def __init__(self, pipeline: "CompilePipeline", compile_wait: float, compile_time: float, handoff_wait: float):
+        self._pipeline = pipeline
+        self.compile_wait = compile_wait
+        self.compile_time = compile_time
+        self.handoff_wait = handoff_wait
+        self._enqueued_at = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        """Leave the queue (the job got its run slots, or gave up). Idempotent."""
+        if self._released:
+            return
+        self._released = True
+        STAGE_WAIT.labels(stage="run").observe(time.perf_counter() - self._enqueued_at)
+        STAGE_QUEUE_DEPTH.labels(stage="run").dec()
+        self._pipeline._queue.release()
+
+
+class CompilePipeline:
+    """
+    Compile stage of the worker's two-stage (compile -> run) pipeline.
+
+    At most ``concurrency`` jobs compile at once, independently of the CPU
+    slots used by the run stage, so the next job compiles while the current
+    one runs. Compiled jobs wait for the run stage in a queue of
+    ``queue_size`` places; a compiled job keeps its compile slot until it
+    gets a place, so compilation backs off when the run stage falls behind.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(1, queue_size)
+        self._compile = asyncio.Semaphore(self.concurrency)
+        self._queue = asyncio.Semaphore(self.queue_size)
+
+    async def compile(self, fn: Callable[[], Awaitable[T]]) -> tuple[HandOff, T]:
+        """Run ``fn`` in the compile stage and enqueue the job for the run stage."""
+        waited = time.perf_counter()
+        STAGE_QUEUE_DEPTH.labels(stage="compile").inc()
+        try:
+            await self._compile.acquire()
+        finally:
+            STAGE_QUEUE_DEPTH.labels(stage="compile").dec()
+        started = time.perf_counter()
+        compile_wait = started - waited
+        STAGE_WAIT.labels(stage="compile").observe(compile_wait)
+        try:
+            result = await fn()
+            compiled = time.perf_counter()
+            STAGE_DURATION.labels(stage="compile").observe(compiled - started)
+            await self._queue.acquire()
+        finally:
+            self._compile.release()
+        STAGE_QUEUE_DEPTH.labels(stage="run").inc()
+        return HandOff(self, compile_wait, compiled - started, time.perf_counter() - compiled), result
+
+
+def pipeline_from_env(run_slots: int) -> CompilePipeline:
+    return CompilePipeline(
+        concurrency=int(os.getenv("COMPILE_CONCURRENCY", "2")),
+        queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", str(run_slots))),
+    )
@@ -0,0 +1,33 @@
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+# /tmp 같은 공유 디렉터리에서 다른 사용자가 심어 두었거나 바꿀 수 있는 파일은 실행하거나 읽지 않는다.
+
+
+def trusted(path: Path, directory: bool = False) -> bool:
+    """
+    True if ``path`` (not following symlinks) is a regular file, or a
+    directory, owned by this user or root and not writable by group/others.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    kind = stat.S_ISDIR(st.st_mode) if directory else stat.S_ISREG(st.st_mode)
+    return kind and st.st_uid in (0, os.getuid()) and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def private_dir(configured: Optional[str], name: str) -> Path:
+    """
+    The directory ``configured``, or ``<temp dir>/<name>-<uid>``, created with
+    mode 0700 if missing. Raises ``PermissionError`` if it is not a directory
+    owned by this user (or root), or if group/others can write to it.
+    """
+    path = Path(configured) if configured else Path(tempfile.gettempdir()) / f"{name}-{os.getuid()}"
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not trusted(path, directory=True):
+        raise PermissionError(f"{path} is not owned by this user or is writable by others")
+    return path
@@ -0,0 +1,502 @@
+import asyncio
+import functools
+import hashlib
+import os
+import resource
+import signal
+import socket
+import subprocess
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from .private_dir import private_dir, trusted
+from .utils.logging_middleware_worker import logger
+
+
+# 제출 코드를 fork/exec 하고 wait4()로 얻은 rusage를 보고하는 작은 런처.
+# 워커(파이썬)에서 바로 fork하면 자식의 ru_maxrss가 워커의 RSS만큼 부풀려지므로,
+# RSS가 작은 이 런처가 대신 fork한다.
+_LAUNCHER_SRC = r"""
+#define _GNU_SOURCE
+#include <errno.h>
+#include <fcntl.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <sys/prctl.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+
+int main(int argc, char **argv) {
+    int report_fd = -1, ack_fd = -1, opt;
+    long long mem = 0;
+    long cpu = 0;
+    const char *cgroup = NULL;
+    while ((opt = getopt(argc, argv, "+r:a:m:g:t:")) != -1) {
+        switch (opt) {
+        case 'r': report_fd = atoi(optarg); break;
+        case 'a': ack_fd = atoi(optarg); break;
+        case 'm': mem = atoll(optarg); break;
+        case 'g': cgroup = optarg; break;
+        case 't': cpu = atol(optarg); break;
+        default: return 120;
+        }
+    }
+    if (report_fd < 0 || optind >= argc) return 120;
+    prctl(PR_SET_PDEATHSIG, SIGKILL);
+    if (cgroup) {
+        char path[4096];
+        snprintf(path, sizeof path, "%s/cgroup.procs", cgroup);
+        int fd = open(path, O_WRONLY);
+        if (fd < 0 || write(fd, "0", 1) != 1) { perror("oj-launch: cgroup"); return 121; }
+        close(fd);
+    }
+    pid_t pid = fork();
+    if (pid < 0) { perror("oj-launch: fork"); return 122; }
+    if (pid == 0) {
+        prctl(PR_SET_PDEATHSIG, SIGKILL);
+        close(report_fd);
+        if (ack_fd >= 0) close(ack_fd);
+        if (mem > 0) {
+            struct rlimit rl = { (rlim_t)mem, (rlim_t)mem };
+            setrlimit(RLIMIT_AS, &rl);
+        }
+        if (cpu > 0) {
+            /* soft 한도에서 SIGXCPU, 그래도 계속 돌면 hard 한도에서 SIGKILL */
+            struct rlimit rl = { (rlim_t)cpu, (rlim_t)cpu + 1 };
+            setrlimit(RLIMIT_CPU, &rl);
+        }
+        execvp(argv[optind], argv + optind);
+        fprintf(stderr, "oj-launch: cannot execute %s: %s\n", argv[optind], strerror(errno));
+        _exit(127);
+    }
+    dprintf(report_fd, "%d\n", (int)pid);
+    /* 출력 파이프의 EOF가 자식의 종료에만 좌우되도록 표준 입출력을 닫는다. */
+    close(0); close(1); close(2);
+    /* 워커가 pidfd를 연 뒤에 회수한다. 그 전에 회수하면 pid가 재사용될 수 있다. */
+    if (ack_fd >= 0) {
+        char c;
+        while (read(ack_fd, &c, 1) < 0 && errno == EINTR)
+            ;
+        close(ack_fd);
+    }
+    int status;
+    struct rusage ru;
+    while (wait4(pid, &status, 0, &ru) < 0) {
+        if (errno != EINTR) return 123;
+    }
+    dprintf(report_fd, "%d %ld %ld.%06ld %ld.%06ld\n", status, ru.ru_maxrss,
+            (long)ru.ru_utime.tv_sec, (long)ru.ru_utime.tv_usec,
+            (long)ru.ru_stime.tv_sec, (long)ru.ru_stime.tv_usec);
+    return 0;
+}
+"""
+
+_launcher_path: Optional[str] = None
+_launcher_checked = False
+
+
+def _launcher_dir() -> Optional[Path]:
+    """``LAUNCHER_DIR``, or a private (0700) directory of this uid in the temp dir; None if not safe."""
+    try:
+        return private_dir(os.getenv("LAUNCHER_DIR"), "oj-launch")
+    except OSError:
+        return None
+
+
+async def _ensure_launcher() -> Optional[str]:
+    """
+    Compile the launcher once per host (cached by source hash). None if no C
+    compiler, or if the launcher directory or an existing launcher binary is
+    owned or writable by another user.
+    """
+    global _launcher_path, _launcher_checked
+    if _launcher_checked:
+        return _launcher_path
+    digest = hashlib.sha256(_LAUNCHER_SRC.encode()).hexdigest()[:12]
+    directory = _launcher_dir()
+    path = directory / f"oj-launch-{digest}" if directory else None
+    if path is None:
+        logger.warning(
+            "The launcher directory is missing or not private, memory peaks will include the worker's RSS"
+        )
+    elif os.path.lexists(path):
+        if not trusted(path):
+            logger.warning("Refusing the launcher %s: not owned by this user or writable by others", path)
+            path = None
+    else:
+        src = path.with_name(f".{path.name}-{uuid.uuid4().hex}.c")
+        tmp = src.with_suffix("")
+        try:
+            src.write_text(_LAUNCHER_SRC)
+            process = await asyncio.create_subprocess_exec(
+                "gcc", "-O2", "-o", str(tmp), str(src),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise RuntimeError(stderr.decode())
+            os.chmod(tmp, 0o700)
+            os.rename(tmp, path)
+        except Exception as e:
+            logger.warning("Cannot build the process launcher, memory peaks will include the worker's RSS: %s", e)
+            path = None
+        finally:
+            for p in (src, tmp):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+    _launcher_path = str(path) if path else None
+    _launcher_checked = True
+    return _launcher_path
+
+
+@dataclass
+class ProcessUsage:
+    """Kernel accounting of a finished child, from ``wait4``."""
+
+    max_rss_kb: int = 0
+    user_time: float = 0.0  # seconds
+    sys_time: float = 0.0  # seconds
+    oom_killed: bool = False  # 메모리 제한(cgroup)에 걸려 커널이 종료시킴
+
+
+class MemoryCgroup:
+    """A throw-away cgroup v2 under ``root`` enforcing ``memory.max`` for one run."""
+
+    def __init__(self, root: Path, limit_bytes: int):
+        self.path = root / f"run-{uuid.uuid4().hex}"
+        self.path.mkdir()
+        (self.path / "memory.max").write_text(str(limit_bytes))
+        try:
+            (self.path / "memory.swap.max").write_text("0")
+        except OSError:
+            pass
+
+    def peak_kb(self) -> Optional[int]:
+        try:
+            return int((self.path / "memory.peak").read_text()) // 1024
+        except (OSError, ValueError):
+            return None  # memory.peak은 커널 5.19 이상에서만 제공됨
+
+    def oom_killed(self) -> bool:
+        try:
+            for line in (self.path / "memory.events").read_text().splitlines():
+                key, _, value = line.partition(" ")
+                if key == "oom_kill" and int(value) > 0:
+                    return True
+        except (OSError, ValueError):
+            pass
+        return False
+
+    def remove(self) -> None:
+        try:
+            self.path.rmdir()
+        except OSError as e:
+            logger.warning("Cannot remove cgroup %s: %s", self.path, e)
+
+
+def _pidfd_open(pid: int) -> Optional[int]:
+    try:
+        return os.pidfd_open(pid)
+    except (OSError, AttributeError):
+        return None  # 이미 회수됨 또는 미지원 (리눅스 5.3 미만)
+
+
+async def _wait4(pid: int, pidfd: Optional[int]) -> tuple[int, resource.struct_rusage]:
+    """
+    ``wait4`` our child ``pid`` without holding a thread while it runs: wait
+    until its pidfd becomes readable (it exited), or poll without one.
+    """
+    if pidfd is not None:
+        loop = asyncio.get_running_loop()
+        exited = loop.create_future()
+        loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+        _, status, ru = os.wait4(pid, 0)
+        return status, ru
+    while True:
+        wpid, status, ru = os.wait4(pid, os.WNOHANG)
+        if wpid:
+            return status, ru
+        await asyncio.sleep(0.01)
+
+
+async def _pipe_reader(loop: asyncio.AbstractEventLoop, pipe) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader(limit=2 ** 16, loop=loop)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), pipe)
+    return reader
+
+
+class PythonZygote:
+    """
+    Warm runtime for one Python submission (see ``zygote.py``).
+
+    The zygote compiles the submission once; each test case is then a
+    ``fork()`` of it instead of a fresh interpreter start. Children still
+    start from the zygote's pristine state, so test cases stay isolated.
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process, control: socket.socket):
+        self._process = process
+        self._control = control
+
+    @classmethod
+    async def start(cls, file_path: Path, timeout: Optional[float] = None) -> Optional["PythonZygote"]:
+        """
+        Start a zygote for ``file_path``; None if it does not compile. Raises
+        ``TimeoutError`` (after killing it) if compiling takes over ``timeout`` seconds.
+        """
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "python3", str(Path(__file__).with_name("zygote.py")), str(theirs.fileno()), str(file_path),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                pass_fds=(theirs.fileno(),),
+                start_new_session=True,
+            )
+        finally:
+            theirs.close()
+        self = cls(process, ours)
+        ours.setblocking(False)
+        try:
+            reply = await asyncio.wait_for(asyncio.get_running_loop().sock_recv(ours, 16), timeout)
+        except BaseException as e:
+            self._process.kill()
+            await self.close()
+            if isinstance(e, asyncio.TimeoutError):
+                raise TimeoutError(f"The warm runtime did not compile {file_path.name} in {timeout}s") from None
+            raise
+        ours.setblocking(True)  # spawn()은 블로킹 전송을 쓴다
+        if reply != b"ready":
+            await self.close()
+            return None
+        return self
+
+    def spawn(self, options: list[str]) -> tuple[list[int], socket.socket]:
+        """Ask the zygote for a child; return our ends of its stdin/stdout/stderr and the report socket."""
+        report, report_theirs = socket.socketpair()
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        try:
+            # 작은 SEQPACKET 메시지 하나이므로 블로킹 전송이어도 곧바로 끝난다.
+            socket.send_fds(
+                self._control, [" ".join(options).encode()],
+                [report_theirs.fileno(), stdin_r, stdout_w, stderr_w],
+            )
+        except BaseException:
+            for fd in (stdin_w, stdout_r, stderr_r):
+                os.close(fd)
+            report.close()
+            raise
+        finally:
+            report_theirs.close()
+            for fd in (stdin_r, stdout_w, stderr_w):
+                os.close(fd)
+        return [stdin_w, stdout_r, stderr_r], report
+
+    async def close(self) -> None:
+        self._control.close()  # 제어 소켓이 닫히면 zygote는 스스로 종료한다
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            self._process.kill()
+            await self._process.wait()
+
+
+class JudgedProcess:
+    """
+    A submission process with asyncio pipes and exact kernel accounting.
+
+    Mirrors the parts of ``asyncio.subprocess.Process`` that ``run_code`` uses
+    (``stdin``/``stdout``/``stderr``, ``wait()``, ``kill()``, ``returncode``)
+    and additionally exposes ``usage`` once the process has exited.
+
+    The process is started either through the C launcher (``start``) or as a
+    fork of a ``PythonZygote`` (``fork``); both report the child's pid and
+    its ``wait4`` result over a pipe.
+    """
+
+    def __init__(self) -> None:
+        self.stdin: asyncio.StreamWriter
+        self.stdout: asyncio.StreamReader
+        self.stderr: asyncio.StreamReader
+        self.returncode: Optional[int] = None
+        self.usage = ProcessUsage()
+        self._popen: Optional[subprocess.Popen] = None  # 런처 또는 직접 실행한 프로세스
+        self._report: Optional[asyncio.StreamReader] = None
+        self._child_pidfd: Optional[int] = None
+        self._popen_pidfd: Optional[int] = None
+        self._wait_task: asyncio.Task
+
+    @classmethod
+    async def start(
+        cls,
+        cmd: list[str],
+        *,
+        memory_limit_bytes: int = 0,
+        cpu_limit_seconds: int = 0,
+        cgroup: Optional[MemoryCgroup] = None,
+        preexec_fn: Optional[Callable[[], None]] = None,
+    ) -> "JudgedProcess":
+        self = cls()
+        loop = asyncio.get_running_loop()
+        launcher = await _ensure_launcher()
+        report = None
+        ack: Optional[Callable[[], None]] = None
+        if launcher:
+            report_r, report_w = os.pipe()
+            ack_r, ack_w = os.pipe()
+            args = [launcher, "-r", str(report_w), "-a", str(ack_r)]
+            if memory_limit_bytes:
+                args += ["-m", str(memory_limit_bytes)]
+            if cpu_limit_seconds:
+                args += ["-t", str(cpu_limit_seconds)]
+            if cgroup:
+                args += ["-g", str(cgroup.path)]
+            try:
+                self._popen = subprocess.Popen(
+                    [*args, "--", *cmd],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    pass_fds=(report_w, ack_r),
+                    start_new_session=True,
+                    preexec_fn=preexec_fn,
+                )
+            except BaseException:
+                os.close(ack_w)
+                raise
+            finally:
+                os.close(report_w)
+                os.close(ack_r)
+            report = os.fdopen(report_r, "rb", buffering=0)
+            ack = functools.partial(os.close, ack_w)  # EOF가 확인 신호다
+        else:
+            def _preexec() -> None:
+                if preexec_fn:
+                    preexec_fn()
+                if memory_limit_bytes:
+                    resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+                if cpu_limit_seconds:
+                    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit_seconds, cpu_limit_seconds + 1))
+
+            self._popen = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True,
+                preexec_fn=_preexec,
+            )
+        await self._attach(loop, [self._popen.stdin, self._popen.stdout, self._popen.stderr], report, ack)
+        return self
+
+    @classmethod
+    async def fork(
+        cls,
+        zygote: PythonZygote,
+        *,
+        memory_limit_bytes: int = 0,
+        cpu_limit_seconds: int = 0,
+        cgroup: Optional[MemoryCgroup] = None,
+        cpu: Optional[int] = None,
+    ) -> "JudgedProcess":
+        self = cls()
+        fds, report = zygote.spawn([
+            str(-1 if cpu is None else cpu),
+            str(memory_limit_bytes),
+            str(cpu_limit_seconds),
+            str(cgroup.path) if cgroup else "-",
+        ])
+        stdin, stdout, stderr = (os.fdopen(fd, mode, buffering=0) for fd, mode in zip(fds, ("wb", "rb", "rb")))
+        await self._attach(asyncio.get_running_loop(), [stdin, stdout, stderr], report, lambda: report.send(b"k"))
+        return self
+
+    async def _attach(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        pipes: list,
+        report,
+        ack: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Wire up the pipes. With a ``report``, read the child's pid and open a
+        pidfd for it, then ``ack`` so the launcher/zygote may reap the child:
+        until then its pid cannot be reused, so ``kill()`` is always safe.
+        """
+        if self._popen is not None:
+            self._popen_pidfd = _pidfd_open(self._popen.pid)
+        try:
+            stdin, stdout, stderr = pipes
+            transport, protocol = await loop.connect_write_pipe(
+                lambda: asyncio.streams.FlowControlMixin(loop=loop), stdin
+            )
+            self.stdin = asyncio.StreamWriter(transport, protocol, None, loop)
+            self.stdout = await _pipe_reader(loop, stdout)
+            self.stderr = await _pipe_reader(loop, stderr)
+
+            if report is not None:
+                self._report = await _pipe_reader(loop, report)
+                line = await self._report.readline()
+                if line.strip():
+                    self._child_pidfd = _pidfd_open(int(line))
+        finally:
+            if ack is not None:
+                try:
+                    ack()
+                except OSError:
+                    pass  # 런처/zygote가 이미 종료됨
+        self._wait_task = asyncio.create_task(self._wait())
+
+    def kill(self) -> None:
+        if self.returncode is not None:
+            return
+        try:
+            if self._child_pidfd is not None:
+                # 런처는 살려 두어 rusage를 보고받는다. pidfd로 보내므로 PID 재사용에 안전하다.
+                signal.pidfd_send_signal(self._child_pidfd, signal.SIGKILL)
+            elif self._popen is not None:
+                os.killpg(self._popen.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def _wait(self) -> int:
+        if self._report:
+            final = (await self._report.read()).split()
+            status = None
+            if self._popen is not None:
+                status, _ = await _wait4(self._popen.pid, self._popen_pidfd)
+            if len(final) == 4:
+                self.returncode = os.waitstatus_to_exitcode(int(final[0]))
+                self.usage = ProcessUsage(int(final[1]), float(final[2]), float(final[3]))
+            elif status is not None:
+                # 런처가 자식보다 먼저 죽음 (rusage 없음)
+                self.returncode = os.waitstatus_to_exitcode(status)
+            else:
+                self.returncode = -signal.SIGKILL  # zygote가 사라짐
+        else:
+            status, ru = await _wait4(self._popen.pid, self._popen_pidfd)
+            self.returncode = os.waitstatus_to_exitcode(status)
+            self.usage = ProcessUsage(ru.ru_maxrss, ru.ru_utime, ru.ru_stime)
+        if self._popen is not None:
+            self._popen.returncode = self.returncode
+        for fd in (self._child_pidfd, self._popen_pidfd):
+            if fd is not None:
+                os.close(fd)
+        self._child_pidfd = self._popen_pidfd = None
+        return self.returncode
+
+    async def wait(self) -> int:
+        return await asyncio.shield(self._wait_task)
@@ -0,0 +1,118 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional
+
+from .executor import ExecutionResult, _passed
+from .utils.logging_middleware_worker import PROGRESS_COALESCED, PROGRESS_FRAMES
+
+# 0이면 예전처럼 테스트케이스마다 progress 메시지를 하나씩 발행한다.
+PROGRESS_BATCH_WINDOW_MS = int(os.getenv("PROGRESS_BATCH_WINDOW_MS", "0"))
+PROGRESS_BATCH_SIZE = int(os.getenv("PROGRESS_BATCH_SIZE", "50"))
+PROGRESS_COALESCE_PASSED = os.getenv("PROGRESS_COALESCE_PASSED", "true").lower() in ("1", "true", "yes")
+
+
+def _failed(res: ExecutionResult, expected: Optional[str]) -> bool:
+    if expected is not None:
+        return not _passed(res, expected)
+    return res.exitCode != 0 or res.timedOut or res.outputLimitExceeded or res.memoryLimitExceeded
+
+
+class ProgressBatcher:
+    """
+    Collects the per-test-case progress of one job into ``progress_batch`` frames.
+
+    A frame is published when ``window`` seconds have passed since its first
+    item, when it holds ``max_items`` items, as soon as a case fails, and by
+    ``close()`` right before the final message. With ``coalesce``, only the
+    latest passing case of a frame is kept (failing cases are always sent in
+    full); ``completed`` still counts every finished case. A ``window`` of 0
+    publishes one ``progress`` message per case, as older API servers expect.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[dict], Awaitable[None]],
+        expected: Optional[list[str]] = None,
+        *,
+        window: float = PROGRESS_BATCH_WINDOW_MS / 1000,
+        max_items: int = PROGRESS_BATCH_SIZE,
+        coalesce: bool = PROGRESS_COALESCE_PASSED,
+    ):
+        self._publish = publish
+        self._expected = expected
+        self.window = window
+        self.max_items = max(1, max_items)
+        self.coalesce = coalesce
+        self._items: list[dict] = []
+        self._latest_passed: Optional[dict] = None
+        self._completed = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _pending(self) -> int:
+        return len(self._items) + (self._latest_passed is not None)
+
+    async def add(self, res: ExecutionResult, idx: int) -> None:
+        """Record the result of test case ``idx``; ``execute_code_multiple``'s ``progress_cb``."""
+        self._completed += 1
+        item = {"index": idx, "result": res.model_dump()}
+        if not self.enabled:
+            PROGRESS_FRAMES.labels(type="progress").inc()
+            await self._publish({"type": "progress", **item})
+            return
+
+        exp = self._expected[idx] if self._expected and idx < len(self._expected) else None
+        failed = _failed(res, exp)
+        if failed or not self.coalesce:
+            self._items.append(item)
+        else:
+            if self._latest_passed is not None:
+                PROGRESS_COALESCED.inc()
+            self._latest_passed = item
+
+        if failed or self._pending() >= self.max_items:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self._timer = None
+        await self.flush()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def flush(self) -> None:
+        """Publish the pending items (if any) as one ``progress_batch`` frame."""
+        self._cancel_timer()
+        # 프레임끼리 순서가 뒤바뀌지 않도록 발행까지 잠금 안에서 한다.
+        async with self._lock:
+            items = self._items
+            if self._latest_passed is not None:
+                items.append(self._latest_passed)
+            if not items:
+                return
+            self._items, self._latest_passed = [], None
+            items.sort(key=lambda item: item["index"])
+            PROGRESS_FRAMES.labels(type="progress_batch").inc()
+            await self._publish({
+                "type": "progress_batch",
+                "items": items,
+                "completed": self._completed,
+            })
+
+    async def close(self) -> None:
+        """Flush what is left; call before publishing the final message."""
+        await self.flush()
+
+    def discard(self) -> None:
+        """Drop pending items without publishing them (the job failed)."""
+        self._cancel_timer()
+        self._items, self._latest_passed = [], None
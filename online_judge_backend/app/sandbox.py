@@ -0,0 +1,290 @@
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+from .process import JudgedProcess, ProcessUsage
+from .utils.logging_middleware_worker import logger
+
+# 박스 안에서 보이는 작업 디렉터리
+BOX_DIR = Path("/box")
+_BOX_ENV = ["PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin", "HOME=/box"]
+
+
+class SandboxError(RuntimeError):
+    """isolate itself failed (not the submission); the job should be retried."""
+
+
+def _read_meta(path: Path) -> dict[str, str]:
+    meta = {}
+    try:
+        for line in path.read_text().splitlines():
+            key, _, value = line.partition(":")
+            meta[key] = value
+    except OSError:
+        pass
+    return meta
+
+
+class IsolateBox:
+    """One isolate sandbox (``--box-id``), initialized once and reused across runs."""
+
+    def __init__(self, box_id: int):
+        self.box_id = box_id
+        self.root: Optional[Path] = None  # isolate --init이 알려 주는 박스 경로
+        self.dirty = True  # 다음 사용 전에 --cleanup/--init이 필요함
+
+    @property
+    def dir(self) -> Path:
+        return self.root / "box"
+
+
+class IsolatePool:
+    """
+    Pool of reusable isolate boxes for the worker.
+
+    Every concurrently running process (test case or compilation) gets a box
+    of its own, so the pool grows to the worker's concurrency and stays there.
+    Boxes are initialized once; between runs only the files in the box are
+    removed. A box is re-initialized only if a run ended abnormally.
+    """
+
+    def __init__(
+        self,
+        first_box: int = 0,
+        use_cgroups: bool = False,
+        processes: int = 64,
+        fsize_kb: int = 64 * 1024,
+        extra_dirs: Optional[list[str]] = None,
+        compile_time_limit: float = 10.0,
+    ):
+        self.first_box = first_box
+        self.use_cgroups = use_cgroups
+        self.processes = processes
+        self.fsize_kb = fsize_kb
+        self.extra_dirs = extra_dirs or []
+        self.compile_time_limit = compile_time_limit
+        self._idle: list[IsolateBox] = []
+        self._created = 0
+        self._meta_dir = Path(tempfile.mkdtemp(prefix="oj-isolate-meta-"))
+
+    def _base_cmd(self, box: IsolateBox) -> list[str]:
+        cmd = ["isolate", f"--box-id={box.box_id}"]
+        if self.use_cgroups:
+            cmd.append("--cg")
+        return cmd
+
+    async def _isolate(self, box: IsolateBox, *args: str) -> str:
+        process = await asyncio.create_subprocess_exec(
+            *self._base_cmd(box), *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise SandboxError(f"isolate {' '.join(args)} failed for box {box.box_id}: {stderr.decode().strip()}")
+        return stdout.decode().strip()
+
+    async def acquire(self) -> IsolateBox:
+        if self._idle:
+            box = self._idle.pop()
+        else:
+            box = IsolateBox(self.first_box + self._created)
+            self._created += 1
+        if box.dirty:
+            try:
+                await self._isolate(box, "--cleanup")
+                box.root = Path(await self._isolate(box, "--init"))
+            except BaseException:
+                self._idle.append(box)
+                raise
+            box.dirty = False
+        return box
+
+    def release(self, box: IsolateBox, clean: bool = True) -> None:
+        """Return ``box`` to the pool after a fast cleanup (or mark it for re-init)."""
+        if clean and not box.dirty:
+            try:
+                for entry in box.dir.iterdir():
+                    if entry.is_dir() and not entry.is_symlink():
+                        shutil.rmtree(entry)
+                    else:
+                        entry.unlink()
+            except OSError as e:
+                logger.warning(f"Fast cleanup of isolate box {box.box_id} failed, re-initializing: {e}")
+                box.dirty = True
+        else:
+            box.dirty = True
+        self._idle.append(box)
+
+    @staticmethod
+    def _copy_in(box: IsolateBox, workdir: Path) -> None:
+        for entry in workdir.iterdir():
+            if entry.is_file():
+                shutil.copy2(entry, box.dir / entry.name)
+
+    def _run_args(
+        self,
+        box: IsolateBox,
+        meta: Path,
+        *,
+        time_limit: Optional[float],
+        wall_limit: float,
+        memory_limit_bytes: int = 0,
+        cg_memory_bytes: int = 0,
+        processes: Optional[int] = None,
+    ) -> list[str]:
+        args = [
+            *self._base_cmd(box), "--run", "--silent", f"--meta={meta}",
+            f"--wall-time={wall_limit:.3f}", f"--fsize={self.fsize_kb}",
+            "--processes" if processes == 0 else f"--processes={processes or self.processes}",
+            *(f"--env={env}" for env in _BOX_ENV),
+            *(f"--dir={d}" for d in self.extra_dirs),
+        ]
+        if time_limit is not None:
+            # CPU 시간 초과 판정은 rusage 값(> 제한)으로 하므로 조금 더 돌게 둔다.
+            args += [f"--time={time_limit:.3f}", "--extra-time=0.2"]
+        if memory_limit_bytes:
+            args.append(f"--mem={memory_limit_bytes // 1024}")
+        if self.use_cgroups and cg_memory_bytes:
+            args.append(f"--cg-mem={cg_memory_bytes // 1024}")
+        return args
+
+    async def start(
+        self,
+        workdir: Path,
+        cmd: list[str],
+        *,
+        time_limit: float,
+        wall_limit: float,
+        memory_limit_bytes: int = 0,
+        cg_memory_bytes: int = 0,
+        preexec_fn: Optional[Callable[[], None]] = None,
+    ) -> "IsolateProcess":
+        """Copy ``workdir`` into a box and start ``cmd`` there (paths relative to ``BOX_DIR``)."""
+        box = await self.acquire()
+        meta = self._meta_dir / f"{box.box_id}-{uuid.uuid4().hex}"
+        try:
+            await asyncio.to_thread(self._copy_in, box, workdir)
+            popen = subprocess.Popen(
+                [*self._run_args(
+                    box, meta,
+                    time_limit=time_limit,
+                    wall_limit=wall_limit,
+                    memory_limit_bytes=memory_limit_bytes,
+                    cg_memory_bytes=cg_memory_bytes,
+                ), "--", *cmd],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=True,
+                preexec_fn=preexec_fn,
+            )
+        except BaseException:
+            self.release(box, clean=False)
+            raise
+        process = IsolateProcess(self, box, meta)
+        process._popen = popen
+        await process._attach(asyncio.get_running_loop(), [popen.stdin, popen.stdout, popen.stderr], None)
+        return process
+
+    async def compile(self, cmd: list[str], workdir: Path) -> tuple[int, str]:
+        """Run a compiler on the files of ``workdir`` in a box and copy its outputs back."""
+        box = await self.acquire()
+        meta = self._meta_dir / f"{box.box_id}-{uuid.uuid4().hex}"
+        clean = False
+        try:
+            await asyncio.to_thread(self._copy_in, box, workdir)
+            process = await asyncio.create_subprocess_exec(
+                *self._run_args(
+                    box, meta,
+                    time_limit=self.compile_time_limit,
+                    wall_limit=self.compile_time_limit * 2,
+                    processes=0,
+                ), "--", *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            result = _read_meta(meta)
+            # 메타 파일이 없거나 status XX(isolate 내부 오류)면 제출 코드가 아니라 샌드박스의 문제다.
+            if not result or result.get("status") == "XX":
+                raise SandboxError(f"isolate failed to compile in box {box.box_id}: {result.get('message', 'no meta file')}")
+            if "exitcode" not in result and "exitsig" not in result:
+                raise RuntimeError(result.get("message") or "Compilation failed")
+            returncode = int(result.get("exitcode", -1))
+            if returncode == 0:
+                for entry in box.dir.iterdir():
+                    if entry.is_file() and not (workdir / entry.name).exists():
+                        shutil.copy2(entry, workdir / entry.name)
+            clean = True
+            return returncode, stderr.decode(errors="replace")
+        finally:
+            meta.unlink(missing_ok=True)
+            self.release(box, clean=clean)
+
+
+class IsolateProcess(JudgedProcess):
+    """A ``JudgedProcess`` running inside an isolate box; usage comes from the meta file."""
+
+    def __init__(self, pool: IsolatePool, box: IsolateBox, meta: Path):
+        super().__init__()
+        self._pool = pool
+        self._box = box
+        self._meta = meta
+
+    def kill(self) -> None:
+        if self.returncode is not None or self._popen is None:
+            return
+        try:
+            # SIGKILL이면 박스 안 프로세스가 남으므로, isolate가 정리하도록 SIGTERM을 보낸다.
+            os.killpg(self._popen.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    async def _wait(self) -> int:
+        meta: dict[str, str] = {}
+        try:
+            await super()._wait()
+            meta = _read_meta(self._meta)
+            if "exitsig" in meta:
+                self.returncode = -int(meta["exitsig"])
+            elif "exitcode" in meta:
+                self.returncode = int(meta["exitcode"])
+            else:
+                logger.error(f"isolate box {self._box.box_id} failed: {meta.get('message', 'no meta file')}")
+            self.usage = ProcessUsage(
+                max_rss_kb=int(meta.get("cg-mem") or meta.get("max-rss") or 0),
+                user_time=float(meta.get("time", 0)),  # isolate는 user+sys 합계만 알려 준다
+                oom_killed=meta.get("cg-oom-killed") == "1",
+            )
+            return self.returncode
+        finally:
+            self._meta.unlink(missing_ok=True)
+            # 정상적으로 끝난 박스만 빠른 정리 후 재사용한다.
+            finished = ("exitcode" in meta or "exitsig" in meta) and meta.get("status") != "XX"
+            self._pool.release(self._box, clean=finished)
+
+
+def sandbox_from_env() -> Optional[IsolatePool]:
+    """Return the isolate pool if ``EXECUTION_BACKEND=isolate``, else None (local processes)."""
+    backend = os.getenv("EXECUTION_BACKEND", "local").lower()
+    if backend == "local":
+        return None
+    if backend != "isolate":
+        raise ValueError(f"Unknown EXECUTION_BACKEND: {backend}")
+    dirs = os.getenv("ISOLATE_EXTRA_DIRS", "/etc")
+    return IsolatePool(
+        first_box=int(os.getenv("ISOLATE_BOX_BASE", "0")),
+        use_cgroups=os.getenv("ISOLATE_CGROUPS", "false").lower() in ("1", "true", "yes"),
+        processes=int(os.getenv("ISOLATE_PROCESSES", "64")),
+        fsize_kb=int(os.getenv("ISOLATE_FSIZE_KB", str(64 * 1024))),
+        extra_dirs=[d for d in dirs.split(",") if d],
+        compile_time_limit=float(os.getenv("COMPILE_TIME_LIMIT_SECONDS", "10")),
+    )
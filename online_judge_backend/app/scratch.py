@@ -0,0 +1,115 @@
+import atexit
+import fcntl
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .utils.logging_middleware_worker import logger
+
+
+class ScratchQuotaExceeded(RuntimeError):
+    """Build output is over the quota; ``prepare_code`` reports it as the job's compile error."""
+
+
+def _default_root() -> Path:
+    # /dev/shm은 대부분의 리눅스(및 컨테이너)에서 tmpfs다.
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm / "oj-jobs"
+    return Path(tempfile.gettempdir()) / "oj-jobs"
+
+
+class ScratchSpace:
+    """
+    Per-job scratch directories for the worker, ideally on a tmpfs.
+
+    Each worker process owns ``<root>/worker-<id>/`` and keeps an ``flock`` on
+    its ``.lock`` file while it is alive. Every job gets one directory inside
+    it that holds all of the job's artifacts and is removed with a single
+    ``rmtree`` when the job ends. ``sweep()`` removes the directories of
+    workers that are gone (their lock is free), e.g. after a crash.
+
+    The quota (``check_quota``) only covers what compiling writes here.
+    Submissions do not run with the job directory as their working
+    directory, so files they write at run time are neither kept in it nor
+    counted; with the isolate backend those writes are limited by the box
+    (``ISOLATE_FSIZE_KB``).
+    """
+
+    # 잠금 파일이 생기기 전에 죽은 워커의 디렉터리는 이 시간이 지나면 지운다.
+    _UNLOCKED_GRACE_SECONDS = 60
+
+    def __init__(self, root: Path, quota_bytes: int):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.owner = self.root / f"worker-{uuid.uuid4().hex}"
+        self.owner.mkdir()
+        self._lock_fd = os.open(self.owner / ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        atexit.register(shutil.rmtree, self.owner, True)
+
+    def sweep(self) -> int:
+        """Remove scratch directories left behind by dead workers; return how many."""
+        removed = 0
+        for path in self.root.glob("worker-*"):
+            if path == self.owner:
+                continue
+            try:
+                fd = os.open(path / ".lock", os.O_RDWR)
+            except FileNotFoundError:
+                if time.time() - path.stat().st_mtime < self._UNLOCKED_GRACE_SECONDS:
+                    continue
+                fd = None
+            except OSError:
+                continue
+            try:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+            except BlockingIOError:
+                pass  # 살아 있는 워커
+            finally:
+                if fd is not None:
+                    os.close(fd)
+        if removed:
+            logger.info(f"Removed {removed} orphaned scratch director(ies) under {self.root}")
+        return removed
+
+    @contextmanager
+    def job(self) -> Iterator[Path]:
+        """Yield a fresh directory for one job and remove it, whatever happens."""
+        path = Path(tempfile.mkdtemp(prefix="job-", dir=self.owner))
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def check_quota(self, path: Path) -> None:
+        """Raise ``ScratchQuotaExceeded`` if the build output in ``path`` is over the quota."""
+        used = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+        if used > self.quota_bytes:
+            raise ScratchQuotaExceeded(
+                f"Build output uses {used} bytes, more than the {self.quota_bytes} byte scratch quota"
+            )
+
+
+_scratch: Optional[ScratchSpace] = None
+
+
+def scratch_space() -> ScratchSpace:
+    """Return this process's scratch space (created on first use)."""
+    global _scratch
+    if _scratch is None:
+        root = os.getenv("JOB_SCRATCH_DIR")
+        _scratch = ScratchSpace(
+            root=Path(root) if root else _default_root(),
+            quota_bytes=int(os.getenv("JOB_SCRATCH_QUOTA_MB", "256")) * 1024 * 1024,
+        )
+    return _scratch
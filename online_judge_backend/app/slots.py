@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from .utils.logging_middleware_worker import (
+    logger,
+    WORKER_SLOTS_BUSY,
+    WORKER_SLOTS_IDLE,
+    WORKER_SLOTS_TOTAL,
+    SLOT_BUSY_SECONDS,
+    SLOT_WAIT,
+)
+
+
+def parse_cpu_list(value: str) -> list[int]:
+    """Parse a Linux style CPU list such as ``"0-3,8,10-11"``."""
+    cpus: list[int] = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus() -> list[int]:
+    """Return the CPUs this process may run on, sorted."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:  # non-Linux
+        return list(range(os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class CpuSlot:
+    index: int
+    cpu: Optional[int]  # None이면 CPU 고정(pinning)을 하지 않음
+
+
+class CpuSlots:
+    """
+    A fixed pool of execution slots, one per judging core.
+
+    Each job holds a slot for the whole time its test cases run, so at most
+    ``size`` submissions execute at once and every one of them can be pinned
+    to its own core for timing fairness.
+    """
+
+    def __init__(self, size: int, cpus: Optional[list[int]] = None, pin: bool = True):
+        if size < 1:
+            raise ValueError("slot pool size must be at least 1")
+        cpus = cpus or available_cpus()
+        if size > len(cpus):
+            logger.warning(
+                "Worker concurrency %d exceeds available CPUs %d; slots will share cores",
+                size, len(cpus),
+            )
+        self.size = size
+        self._free: asyncio.Queue[CpuSlot] = asyncio.Queue()
+        for i in range(size):
+            self._free.put_nowait(CpuSlot(index=i, cpu=cpus[i % len(cpus)] if pin else None))
+        WORKER_SLOTS_TOTAL.set(size)
+        self._report()
+
+    @property
+    def busy(self) -> int:
+        return self.size - self._free.qsize()
+
+    def _report(self) -> None:
+        WORKER_SLOTS_BUSY.set(self.busy)
+        WORKER_SLOTS_IDLE.set(self._free.qsize())
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[CpuSlot]:
+        """Wait for a free slot and hold it for the duration of the block."""
+        wait_start = time.perf_counter()
+        slot = await self._free.get()
+        held_from = time.perf_counter()
+        SLOT_WAIT.observe(held_from - wait_start)
+        self._report()
+        try:
+            yield slot
+        finally:
+            self._free.put_nowait(slot)
+            SLOT_BUSY_SECONDS.inc(time.perf_counter() - held_from)
+            self._report()
+
+    @asynccontextmanager
+    async def acquire_extra(self, count: int) -> AsyncIterator[list[CpuSlot]]:
+        """
+        Take up to ``count`` additional slots that are free right now.
+
+        Never waits: a job that wants to run test cases in parallel only
+        borrows cores nobody else is using.
+        """
+        taken: list[CpuSlot] = []
+        while len(taken) < count:
+            try:
+                taken.append(self._free.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        held_from = time.perf_counter()
+        self._report()
+        try:
+            yield taken
+        finally:
+            for slot in taken:
+                self._free.put_nowait(slot)
+            SLOT_BUSY_SECONDS.inc((time.perf_counter() - held_from) * len(taken))
+            self._report()
+
+
+def slots_from_env() -> CpuSlots:
+    """Build the worker's slot pool from ``WORKER_CONCURRENCY``/``WORKER_CPUS``/``WORKER_PIN_CPUS``."""
+    concurrency = int(os.getenv("WORKER_CONCURRENCY", "1"))
+    cpu_env = os.getenv("WORKER_CPUS", "").strip()
+    cpus = parse_cpu_list(cpu_env) if cpu_env else None
+    pin = os.getenv("WORKER_PIN_CPUS", "true").lower() in ("1", "true", "yes")
+    return CpuSlots(concurrency, cpus=cpus, pin=pin)
@@ -0,0 +1,219 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import aioboto3
+
+from .private_dir import private_dir, trusted
+from .utils.logging_middleware_worker import logger, TESTDATA_CACHE_REQUESTS
+
+
+class TestDataVersionMismatch(RuntimeError):
+    """
+    Neither S3 nor the static files hold the version the message refers to:
+    the API graded against a copy the worker cannot get (e.g. its problem
+    cache had not seen an update yet), so it should resend the data inline.
+    """
+
+
+class TestDataCache:
+    """
+    Version-keyed, on-disk cache of problem test data for the worker.
+
+    ``execute`` messages may reference test data by ``problemId`` and content
+    ``version`` instead of carrying every input/output inline. The first job
+    for a version downloads the problem JSON once (S3, or the bundled static
+    files) and unpacks it to ``<root>/<problem>/<version>/{i}.in|{i}.out``;
+    later jobs read the files from there, so the page cache is shared by every
+    worker on the host. If the downloaded content is another version, the
+    other source (S3 or static files) is tried before giving up.
+
+    Least recently used versions (by directory mtime, refreshed on every hit)
+    are removed once the cache grows beyond ``max_bytes``. The root must be
+    private to the worker's user (``PermissionError`` otherwise).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        local_dir: Path,
+        bucket: str,
+        prefix: str = "",
+        session: Optional[aioboto3.Session] = None,
+        endpoint_url: Optional[str] = None,
+        max_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.root = private_dir(str(root), "oj-testdata")
+        self.max_bytes = max_bytes
+        self.local_dir = local_dir
+        self.bucket = bucket
+        self.prefix = prefix
+        self.session = session
+        self.endpoint_url = endpoint_url
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    def _dir(self, problem_id: str, version: str) -> Path:
+        safe = hashlib.sha256(problem_id.encode()).hexdigest()[:16]
+        return self.root / safe / version
+
+    async def _from_s3(self, key: str) -> bytes:
+        async with self.session.client("s3", endpoint_url=self.endpoint_url) as s3:
+            obj = await s3.get_object(Bucket=self.bucket, Key=key)
+            return await obj["Body"].read()
+
+    async def _from_local(self, key: str) -> bytes:
+        return await asyncio.to_thread((self.local_dir / key).read_bytes)
+
+    def _sources(self) -> list[tuple[str, Callable[[str], Awaitable[bytes]]]]:
+        # S3를 먼저 보고, 실패하거나 버전이 다르면 static 파일을 본다.
+        sources = [("S3", self._from_s3)] if self.session else []
+        return sources + [("local files", self._from_local)]
+
+    def _unpack(self, body: bytes, target: Path) -> None:
+        problem = json.loads(body)
+        cases = problem.get("test_cases", [])
+        staging = target.parent / f".tmp-{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+        try:
+            for i, tc in enumerate(cases):
+                (staging / f"{i}.in").write_text(tc.get("input", ""), encoding="utf-8")
+                (staging / f"{i}.out").write_text(str(tc.get("output", "")), encoding="utf-8")
+            (staging / "cases.json").write_text(json.dumps({"count": len(cases)}))
+            # 다른 워커가 먼저 만들었다면 rename이 실패하고, 그쪽 결과를 그대로 쓴다.
+            os.rename(staging, target)
+        except OSError:
+            if not target.exists():
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for problem in self.root.iterdir():
+            if problem.name.startswith(".") or not problem.is_dir():
+                continue
+            for entry in problem.iterdir():
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in entry.iterdir())
+                    entries.append((entry.stat().st_mtime, size, entry))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _evict(self, keep: Path) -> None:
+        """Remove least recently used versions (except ``keep``) until the cache fits in ``max_bytes``."""
+        with open(self.root / ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # 다른 워커가 이미 정리 중
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if entry == keep:
+                    continue
+                # rename 후 삭제하여, 읽는 쪽은 완전한 버전 또는 miss만 보게 한다.
+                trash = self.root / f".trash-{uuid.uuid4().hex}"
+                try:
+                    os.rename(entry, trash)
+                except OSError:
+                    continue
+                shutil.rmtree(trash, ignore_errors=True)
+                total -= size
+                logger.info("Evicted test data %s/%s", entry.parent.name, entry.name)
+
+    def _hit(self, target: Path) -> bool:
+        if not (target / "cases.json").exists():
+            return False
+        if not trusted(target, directory=True):
+            logger.warning("Ignoring cached test data %s: not owned by this user or writable by others", target)
+            return False
+        try:
+            os.utime(target)
+        except OSError:
+            return False  # 방금 evict됨
+        TESTDATA_CACHE_REQUESTS.labels(result="hit").inc()
+        return True
+
+    async def _ensure(self, problem_id: str, version: str) -> Path:
+        target = self._dir(problem_id, version)
+        if self._hit(target):
+            return target
+        lock = self._locks.setdefault((problem_id, version), asyncio.Lock())
+        async with lock:
+            if self._hit(target):
+                return target
+            TESTDATA_CACHE_REQUESTS.labels(result="miss").inc()
+            key = f"{self.prefix}{problem_id}"
+            found, error = [], None
+            try:
+                for name, download in self._sources():
+                    try:
+                        body = await download(key)
+                    except Exception as e:
+                        logger.error("Failed to fetch test data %s from %s: %s", key, name, e)
+                        error = e
+                        continue
+                    actual = hashlib.sha256(body).hexdigest()[:16]
+                    # 받은 내용도 캐시해 두어, 새 버전을 참조하는 다음 요청은 바로 적중하게 한다.
+                    await asyncio.to_thread(self._unpack, body, self._dir(problem_id, actual))
+                    await asyncio.to_thread(self._evict, target)
+                    if actual == version:
+                        return target
+                    found.append(f"{actual} in {name}")
+            finally:
+                self._locks.pop((problem_id, version), None)
+            if not found:
+                raise error
+            raise TestDataVersionMismatch(
+                f"Test data for {problem_id} is version {', '.join(found)}, but version {version} was requested"
+            )
+
+    async def load(
+        self, problem_id: str, version: str, cases: Optional[list[int]] = None
+    ) -> tuple[list[str], list[str]]:
+        """Return ``(stdins, expected)`` for the given test case indices (all if None)."""
+        def _read(target: Path) -> tuple[list[str], list[str]]:
+            count = json.loads((target / "cases.json").read_text())["count"]
+            indices = range(count) if cases is None else cases
+            stdins = [(target / f"{i}.in").read_text(encoding="utf-8") for i in indices]
+            expected = [(target / f"{i}.out").read_text(encoding="utf-8") for i in indices]
+            return stdins, expected
+
+        try:
+            return await asyncio.to_thread(_read, await self._ensure(problem_id, version))
+        except FileNotFoundError:
+            # 읽는 도중에 다른 워커가 evict함: 한 번 더 받아 온다.
+            return await asyncio.to_thread(_read, await self._ensure(problem_id, version))
+
+
+def testdata_cache_from_env() -> TestDataCache:
+    """Build the worker's test data cache from the same AWS settings the API uses."""
+    bucket = os.getenv("AWS_PROBLEMS_BUCKET", "codeground-problems")
+    prefix = os.getenv("AWS_PROBLEMS_BUCKET_PREFIX", "").strip("/")
+    session = None
+    if os.getenv("AWS_ACCESS_KEY_ID") and os.getenv("AWS_SECRET_ACCESS_KEY") and os.getenv("AWS_REGION"):
+        session = aioboto3.Session(
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            region_name=os.getenv("AWS_REGION"),
+        )
+    return TestDataCache(
+        root=private_dir(os.getenv("TESTDATA_CACHE_DIR"), "oj-testdata"),
+        local_dir=Path(__file__).resolve().parents[1] / "static" / bucket,
+        bucket=bucket,
+        prefix=f"{prefix}/" if prefix else "",
+        session=session,
+        endpoint_url=os.getenv("PROBLEMS_BUCKET_ENDPOINT"),
+        max_bytes=int(os.getenv("TESTDATA_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))),
+    )
@@ -0,0 +1,192 @@
+import asyncio
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import aio_pika
+
+from .logging_middleware_judge_api import (
+    logger,
+    ADMISSION_REJECTIONS,
+    EXECUTE_QUEUE_DEPTH,
+    IN_FLIGHT_JOBS,
+)
+
+
+class Overloaded(Exception):
+    """A submission was shed; ``status_code`` is 429 (per-token cap) or 503."""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+@dataclass
+class _Job:
+    token: Optional[str]
+    started: float
+
+
+class AdmissionController:
+    """
+    Load shedding for graded submissions at the API.
+
+    The controller counts the jobs this replica has published and not yet
+    seen a ``final`` for (in total and per ``token``), and polls the depth of
+    the execute queues with a passive declare. A submission is refused when
+
+    - its token already has ``max_per_token`` jobs in flight (429),
+    - this replica has ``max_in_flight`` jobs in flight (503), or
+    - the queue it would go to holds ``max_queue_depth`` messages (503).
+
+    ``reserve`` checks the limits and counts the job in the same call (no
+    await in between), so a burst of concurrent submissions cannot all pass
+    the check before any of them is counted. Limits of 0 are disabled.
+    ``Retry-After`` is the excess work divided by
+    the completion rate this replica observes (an EWMA of finals per second),
+    clamped to ``[1, retry_after_max]``.
+    """
+
+    def __init__(
+        self,
+        max_queue_depth: int = 0,
+        max_in_flight: int = 0,
+        max_per_token: int = 0,
+        poll_interval: float = 2.0,
+        retry_after_max: int = 120,
+        job_ttl: float = 900.0,
+    ):
+        self.max_queue_depth = max_queue_depth
+        self.max_in_flight = max_in_flight
+        self.max_per_token = max_per_token
+        self.poll_interval = poll_interval
+        self.retry_after_max = retry_after_max
+        self.job_ttl = job_ttl
+        self._jobs: dict[str, _Job] = {}
+        self._per_token: dict[str, int] = {}
+        self._depths: dict[str, int] = {}
+        self._rate = 0.0  # 완료율 EWMA (jobs/s)
+        self._rate_at = time.monotonic()
+        self._completed = 0
+        self._poller: Optional[asyncio.Task] = None
+        self._channel: Optional[aio_pika.abc.AbstractChannel] = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, request_id: str) -> bool:
+        return request_id in self._jobs
+
+    async def start(self, connection: aio_pika.abc.AbstractConnection, queues: list[str]) -> None:
+        """Start polling the depth of ``queues`` (only if a depth limit is set)."""
+        if self.max_queue_depth <= 0:
+            return
+        # passive declare가 실패하면 채널이 닫히므로 RPC 채널과 분리한다.
+        self._channel = await connection.channel()
+        self._poller = asyncio.create_task(self._poll(queues))
+
+    async def close(self) -> None:
+        if self._poller:
+            self._poller.cancel()
+        if self._channel:
+            await self._channel.close()
+
+    async def _poll(self, queues: list[str]) -> None:
+        while True:
+            for name in queues:
+                try:
+                    queue = await self._channel.declare_queue(name, passive=True)
+                    depth = queue.declaration_result.message_count
+                    self._depths[name] = depth
+                    EXECUTE_QUEUE_DEPTH.labels(queue=name).set(depth)
+                except Exception as e:
+                    logger.warning(f"Could not read the depth of queue {name}: {e!r}")
+            self._update_rate()
+            await asyncio.sleep(self.poll_interval)
+
+    def _update_rate(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._rate_at
+        if elapsed < 1.0:
+            return
+        sample = self._completed / elapsed
+        self._rate = sample if self._rate == 0 else 0.8 * self._rate + 0.2 * sample
+        self._completed, self._rate_at = 0, now
+
+    def _retry_after(self, excess: int) -> int:
+        self._update_rate()
+        if self._rate <= 0:
+            return self.retry_after_max
+        return max(1, min(self.retry_after_max, math.ceil(max(1, excess) / self._rate)))
+
+    def _expire(self, now: float) -> None:
+        # final이 오지 않은 작업(유실 등)은 TTL이 지나면 세지 않는다. 삽입 순서 = 시작 순서.
+        while self._jobs:
+            rid, job = next(iter(self._jobs.items()))
+            if now - job.started <= self.job_ttl:
+                break
+            self.finished(rid, completed=False)
+
+    def reserve(self, request_id: str, token: Optional[str], queue: str) -> None:
+        """
+        Count ``request_id`` as in flight, or raise ``Overloaded`` if a new job
+        for ``token`` on ``queue`` must be refused. Release it with ``finished``.
+        """
+        self._expire(time.monotonic())
+        if self.max_per_token > 0 and token and self._per_token.get(token, 0) >= self.max_per_token:
+            ADMISSION_REJECTIONS.labels(reason="token_limit").inc()
+            raise Overloaded(
+                429, self._retry_after(1),
+                f"Too many submissions in progress for this token (limit {self.max_per_token})",
+            )
+        if self.max_in_flight > 0 and self.in_flight >= self.max_in_flight:
+            ADMISSION_REJECTIONS.labels(reason="in_flight").inc()
+            raise Overloaded(
+                503, self._retry_after(self.in_flight - self.max_in_flight + 1),
+                "The judge is busy, please retry later",
+            )
+        depth = self._depths.get(queue, 0)
+        if self.max_queue_depth > 0 and depth >= self.max_queue_depth:
+            ADMISSION_REJECTIONS.labels(reason="queue_depth").inc()
+            raise Overloaded(
+                503, self._retry_after(depth - self.max_queue_depth + 1),
+                "The judge queue is full, please retry later",
+            )
+        self.started(request_id, token)
+
+    def started(self, request_id: str, token: Optional[str]) -> None:
+        self._jobs[request_id] = _Job(token, time.monotonic())
+        if token:
+            self._per_token[token] = self._per_token.get(token, 0) + 1
+        IN_FLIGHT_JOBS.set(self.in_flight)
+
+    def finished(self, request_id: str, completed: bool = True) -> None:
+        job = self._jobs.pop(request_id, None)
+        if job is None:
+            return
+        if job.token:
+            left = self._per_token.get(job.token, 1) - 1
+            if left > 0:
+                self._per_token[job.token] = left
+            else:
+                self._per_token.pop(job.token, None)
+        if completed:
+            self._completed += 1
+        IN_FLIGHT_JOBS.set(self.in_flight)
+
+
+def admission_from_env() -> AdmissionController:
+    """Build the API's load shedding from ``ADMISSION_*`` environment variables (0 = no limit)."""
+    return AdmissionController(
+        max_queue_depth=int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", "0")),
+        max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0")),
+        max_per_token=int(os.getenv("ADMISSION_MAX_IN_FLIGHT_PER_TOKEN", "0")),
+        poll_interval=float(os.getenv("ADMISSION_QUEUE_POLL_SECONDS", "2")),
+        retry_after_max=int(os.getenv("ADMISSION_RETRY_AFTER_MAX_SECONDS", "120")),
+        job_ttl=float(os.getenv("META_STORE_TTL_SECONDS", "900")),
+    )
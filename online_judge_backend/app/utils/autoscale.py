@@ -0,0 +1,102 @@
+import math
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from .logging_middleware_judge_api import ARRIVAL_RATE, RECOMMENDED_WORKERS, SERVICE_TIME
+
+
+class CapacityEstimator:
+    """
+    Estimates how many workers the judge needs from what this API replica sees.
+
+    - Arrival rate: jobs this replica published over the last ``window`` seconds.
+    - Service time: mean slot-seconds per job (run time x slots held), from the
+      ``timing`` the worker attaches to each ``final`` message.
+
+    The slots needed are ``rate * service_time / target_utilization`` for the
+    steady state, plus the slots that drain this replica's backlog (jobs in
+    flight beyond the steady state) within ``drain_seconds``. Every term is
+    per replica, so with several API replicas the autoscaler should add up
+    ``slotsNeeded`` and divide by the slots per worker.
+    """
+
+    def __init__(
+        self,
+        slots_per_worker: int = 1,
+        window: float = 60.0,
+        target_utilization: float = 0.7,
+        drain_seconds: float = 30.0,
+        min_workers: int = 1,
+        max_workers: int = 0,
+        default_service_time: float = 1.0,
+    ):
+        self.slots_per_worker = max(1, slots_per_worker)
+        self.window = window
+        self.target_utilization = min(1.0, max(0.05, target_utilization))
+        self.drain_seconds = max(1.0, drain_seconds)
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self._arrivals: deque[float] = deque()
+        self._completions: deque[tuple[float, float]] = deque()
+        self._slot_seconds = 0.0  # _completions의 합
+        self._last_service_time = default_service_time
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._arrivals and self._arrivals[0] < cutoff:
+            self._arrivals.popleft()
+        while self._completions and self._completions[0][0] < cutoff:
+            _, value = self._completions.popleft()
+            self._slot_seconds -= value
+
+    def arrived(self) -> None:
+        self._arrivals.append(time.monotonic())
+
+    def completed(self, timing: Optional[dict]) -> None:
+        """Record a finished job; ``timing`` is the worker's timing of it (if any)."""
+        slot_seconds = (timing or {}).get("slotSeconds")
+        if slot_seconds is None:
+            return
+        self._completions.append((time.monotonic(), float(slot_seconds)))
+        self._slot_seconds += float(slot_seconds)
+
+    def recommend(self, in_flight: int) -> dict:
+        now = time.monotonic()
+        self._prune(now)
+        rate = len(self._arrivals) / self.window
+        if self._completions:
+            self._last_service_time = max(0.0, self._slot_seconds / len(self._completions))
+        service_time = self._last_service_time
+        steady = rate * service_time / self.target_utilization
+        # 정상 상태에서 시스템 안에 있을 작업 수(리틀의 법칙)를 넘는 작업이 밀린 작업이다.
+        backlog = max(0.0, in_flight - rate * service_time)
+        slots_needed = steady + backlog * service_time / self.drain_seconds
+        workers = max(self.min_workers, math.ceil(slots_needed / self.slots_per_worker))
+        if self.max_workers > 0:
+            workers = min(workers, self.max_workers)
+        ARRIVAL_RATE.set(rate)
+        SERVICE_TIME.set(service_time)
+        RECOMMENDED_WORKERS.set(workers)
+        return {
+            "arrivalRate": rate,
+            "serviceTime": service_time,
+            "inFlight": in_flight,
+            "backlog": backlog,
+            "slotsNeeded": slots_needed,
+            "slotsPerWorker": self.slots_per_worker,
+            "recommendedWorkers": workers,
+        }
+
+
+def capacity_estimator_from_env() -> CapacityEstimator:
+    """Build the API's worker-count estimator from ``AUTOSCALE_*`` environment variables."""
+    return CapacityEstimator(
+        slots_per_worker=int(os.getenv("AUTOSCALE_SLOTS_PER_WORKER", os.getenv("WORKER_CONCURRENCY", "1"))),
+        window=float(os.getenv("AUTOSCALE_WINDOW_SECONDS", "60")),
+        target_utilization=float(os.getenv("AUTOSCALE_TARGET_UTILIZATION", "0.7")),
+        drain_seconds=float(os.getenv("AUTOSCALE_DRAIN_SECONDS", "30")),
+        min_workers=int(os.getenv("AUTOSCALE_MIN_WORKERS", "1")),
+        max_workers=int(os.getenv("AUTOSCALE_MAX_WORKERS", "0")),
+    )
@@ -0,0 +1,69 @@
+import time
+
+from .logging_middleware_judge_api import logger, CIRCUIT_BREAKER_STATE
+
+
+class CircuitBreaker:
+    """
+    Minimal circuit breaker for calls to an external dependency.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow()`` returns False for ``reset_timeout`` seconds, so callers can go
+    straight to their fallback. Then a single trial call is let through
+    (half-open): success closes the breaker, failure opens it again. Callers
+    call ``release()`` in a ``finally`` so that a trial which ends without
+    either (e.g. it was cancelled) does not keep the breaker half-open forever.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = self.CLOSED
+        self._trial_in_flight = False
+        self._report()
+
+    def _report(self) -> None:
+        for state in (self.CLOSED, self.OPEN, self.HALF_OPEN):
+            CIRCUIT_BREAKER_STATE.labels(name=self.name, state=state).set(1 if state == self.state else 0)
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+            self._report()
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker {self.name} closed")
+        self.failures = 0
+        self.state = self.CLOSED
+        self._trial_in_flight = False
+        self._report()
+
+    def release(self) -> None:
+        """Give back the half-open trial if the call recorded neither success nor failure."""
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker {self.name} opened after {self.failures} failure(s)")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._report()
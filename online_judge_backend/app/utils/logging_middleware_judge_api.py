@@ -2,7 +2,7 @@ import logging
 from time import time
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
-from prometheus_client import Counter, Histogram, make_asgi_app
+from prometheus_client import Counter, Gauge, Histogram, make_asgi_app
 
 from .logging_utils import configure_logging
 
@@ -21,6 +21,70 @@ REQUEST_LATENCY = Histogram(
     ["method", "endpoint"],
 )
 
+META_STORE_EVICTIONS = Counter(
+    "judge_meta_store_evictions_total",
+    "Request metadata entries dropped before their final message arrived",
+    ["reason"],
+)
+
+PROBLEM_CACHE_REQUESTS = Counter(
+    "judge_problem_cache_requests_total",
+    "Problem definition lookups by cache outcome (hit, miss, revalidated, coalesced)",
+    ["result"],
+)
+PROBLEM_FETCH_LATENCY = Histogram(
+    "judge_problem_fetch_latency_seconds",
+    "Latency of fetching a problem definition from its source in seconds",
+    ["source"],
+)
+
+EXECUTE_PUBLISH_COUNT = Counter(
+    "judge_execute_publish_total",
+    "execute messages published to RabbitMQ by broker confirm outcome (confirmed, failed)",
+    ["result"],
+)
+
+SUBMISSION_DEDUP = Counter(
+    "judge_submission_dedup_total",
+    "Graded submissions by deduplication outcome (miss, coalesced, cache_hit)",
+    ["result"],
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "judge_admission_rejections_total",
+    "Submissions refused by load shedding (token_limit, in_flight, queue_depth)",
+    ["reason"],
+)
+IN_FLIGHT_JOBS = Gauge(
+    "judge_in_flight_jobs",
+    "Jobs this API replica published and has not received a final message for",
+)
+EXECUTE_QUEUE_DEPTH = Gauge(
+    "judge_execute_queue_depth",
+    "Messages waiting in each execute queue, as last polled by the API",
+    ["queue"],
+)
+
+# 워커 수 추천(/autoscale) 입력값과 결과
+ARRIVAL_RATE = Gauge(
+    "judge_arrival_rate",
+    "execute messages published per second by this API replica (sliding window)",
+)
+SERVICE_TIME = Gauge(
+    "judge_service_time_seconds",
+    "Mean worker slot-seconds per job, from the timing in final messages",
+)
+RECOMMENDED_WORKERS = Gauge(
+    "judge_recommended_workers",
+    "Worker count recommended for the load seen by this API replica",
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "judge_circuit_breaker_state",
+    "1 for the current state of each circuit breaker, 0 otherwise",
+    ["name", "state"],
+)
+
 class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         start_time = time()
@@ -1,5 +1,5 @@
 import logging
-from prometheus_client import Counter, Histogram, start_http_server
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 
 from .logging_utils import configure_logging
 
@@ -19,6 +19,132 @@ JOB_DURATION = Histogram(
     "Job processing time in seconds",
 )
 
+# 슬롯(CPU 코어)별 메트릭
+WORKER_SLOTS_TOTAL = Gauge(
+    "worker_slots_total",
+    "Number of execution slots configured in this worker",
+)
+WORKER_SLOTS_BUSY = Gauge(
+    "worker_slots_busy",
+    "Number of execution slots currently running a job",
+)
+WORKER_SLOTS_IDLE = Gauge(
+    "worker_slots_idle",
+    "Number of execution slots currently free",
+)
+SLOT_BUSY_SECONDS = Counter(
+    "worker_slot_busy_seconds_total",
+    "Slot-seconds spent running jobs; rate() over worker_slots_total is the utilization",
+)
+SLOT_WAIT = Histogram(
+    "worker_slot_wait_seconds",
+    "Time a job waited for a free execution slot in seconds",
+)
+SLOT_JOB_COUNT = Counter(
+    "worker_slot_jobs_total",
+    "Total jobs processed per execution slot",
+    ["slot", "result"],
+)
+SLOT_JOB_DURATION = Histogram(
+    "worker_slot_job_duration_seconds",
+    "Job processing time per execution slot in seconds",
+    ["slot"],
+)
+
+ADMISSION_DELAY = Histogram(
+    "worker_admission_delay_seconds",
+    "Delay added by the pacing/admission policy before a job runs in seconds",
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+COMPILE_CACHE_HITS = Counter(
+    "worker_compile_cache_hits_total",
+    "Compilations served from the compiled-artifact cache",
+    ["language"],
+)
+COMPILE_CACHE_MISSES = Counter(
+    "worker_compile_cache_misses_total",
+    "Compilations not found in the compiled-artifact cache",
+    ["language"],
+)
+COMPILE_CACHE_EVICTIONS = Counter(
+    "worker_compile_cache_evictions_total",
+    "Entries evicted from the compiled-artifact cache",
+)
+
+TESTDATA_CACHE_REQUESTS = Counter(
+    "worker_testdata_cache_requests_total",
+    "Test data lookups for jobs that reference test data by version",
+    ["result"],
+)
+
+# 컴파일/실행 2단계 파이프라인 메트릭 (stage: compile | run | publish)
+STAGE_QUEUE_DEPTH = Gauge(
+    "worker_stage_queue_depth",
+    "Jobs waiting to enter a pipeline stage",
+    ["stage"],
+)
+STAGE_WAIT = Histogram(
+    "worker_stage_wait_seconds",
+    "Time a job waited to enter a pipeline stage in seconds",
+    ["stage"],
+)
+STAGE_DURATION = Histogram(
+    "worker_stage_duration_seconds",
+    "Time a job spent in a pipeline stage in seconds",
+    ["stage"],
+)
+
+# 진행 상황 발행 메트릭 (type: progress | progress_batch)
+PROGRESS_FRAMES = Counter(
+    "worker_progress_frames_total",
+    "Progress messages published to the API",
+    ["type"],
+)
+PROGRESS_COALESCED = Counter(
+    "worker_progress_coalesced_total",
+    "Passing test case results replaced by a later one before their frame was published",
+)
+
+# execute 메시지 전달 상태 메트릭
+MESSAGE_REDELIVERIES = Counter(
+    "worker_message_redeliveries_total",
+    "execute messages the broker delivered again because an earlier delivery was never acknowledged",
+)
+MESSAGE_RETRIES = Counter(
+    "worker_message_retries_total",
+    "execute messages put back on the queue with a higher retry count",
+    ["reason"],
+)
+MESSAGE_DEAD_LETTERED = Counter(
+    "worker_dead_lettered_total",
+    "execute messages moved to the dead-letter queue",
+    ["reason"],
+)
+MESSAGE_EXPIRED = Counter(
+    "worker_expired_messages_total",
+    "execute messages dropped because their TTL passed before they ran",
+)
+
+# 레인별 메트릭 (lane: interactive | graded)
+QUEUE_WAIT = Histogram(
+    "worker_queue_wait_seconds",
+    "Time from publishing an execute message to the worker starting it in seconds",
+    ["lane"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+JOB_LATENCY = Histogram(
+    "worker_job_latency_seconds",
+    "Time from publishing an execute message to publishing its final result in seconds",
+    ["lane"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600),
+)
+LANE_JOBS_IN_FLIGHT = Gauge(
+    "worker_lane_jobs_in_flight",
+    "Jobs from each lane currently being handled by the worker",
+    ["lane"],
+)
+
 def start_metrics_server(port: int = 58001) -> None:
     """Expose Prometheus metrics on the given port."""
     for p in range(port, 58100):
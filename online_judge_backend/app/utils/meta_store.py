@@ -0,0 +1,110 @@
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from .logging_middleware_judge_api import logger, META_STORE_EVICTIONS
+
+
+class MetaStore(ABC):
+    """
+    Storage for per-request grading metadata (expected outputs, test case ids ...).
+
+    Entries expire after ``ttl`` seconds so a lost ``final`` message or a
+    crashed worker cannot leak them forever.
+    """
+
+    @abstractmethod
+    async def set(self, request_id: str, meta: dict) -> None: ...
+
+    @abstractmethod
+    async def get(self, request_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def pop(self, request_id: str) -> Optional[dict]: ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryMetaStore(MetaStore):
+    """In-process store with TTL expiry and a cap on the number of entries."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        # 삽입 순서 = 만료 순서이므로 앞에서부터만 확인하면 된다.
+        while self._entries:
+            request_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[request_id]
+            META_STORE_EVICTIONS.labels(reason="expired").inc()
+
+    async def set(self, request_id: str, meta: dict) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        self._entries.pop(request_id, None)
+        self._entries[request_id] = (now + self.ttl, meta)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            META_STORE_EVICTIONS.labels(reason="capacity").inc()
+            logger.warning(f"Metadata store is full, evicted request {evicted}")
+
+    async def get(self, request_id: str) -> Optional[dict]:
+        self._expire(time.monotonic())
+        entry = self._entries.get(request_id)
+        return entry[1] if entry else None
+
+    async def pop(self, request_id: str) -> Optional[dict]:
+        self._expire(time.monotonic())
+        entry = self._entries.pop(request_id, None)
+        return entry[1] if entry else None
+
+
+class RedisMetaStore(MetaStore):
+    """
+    Out-of-process store backed by Redis, shared by every API replica.
+
+    Expiry is delegated to Redis key TTLs; size is bounded by the Redis
+    server's own ``maxmemory`` policy.
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = "oj:meta:"):
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+
+    async def set(self, request_id: str, meta: dict) -> None:
+        await self._redis.set(self.prefix + request_id, json.dumps(meta), px=max(1, int(self.ttl * 1000)))
+
+    async def get(self, request_id: str) -> Optional[dict]:
+        raw = await self._redis.get(self.prefix + request_id)
+        return json.loads(raw) if raw is not None else None
+
+    async def pop(self, request_id: str) -> Optional[dict]:
+        raw = await self._redis.getdel(self.prefix + request_id)
+        return json.loads(raw) if raw is not None else None
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def meta_store_from_env() -> MetaStore:
+    """Use Redis when ``META_STORE_URL`` is set, otherwise an in-memory store."""
+    ttl = float(os.getenv("META_STORE_TTL_SECONDS", "900"))
+    if not ttl > 0:
+        raise ValueError(f"META_STORE_TTL_SECONDS must be positive: {ttl}")
+    url = os.getenv("META_STORE_URL")
+    if url:
+        logger.info("Using Redis metadata store")
+        return RedisMetaStore(url, ttl)
+    max_entries = int(os.getenv("META_STORE_MAX_ENTRIES", "10000"))
+    return InMemoryMetaStore(ttl, max_entries)
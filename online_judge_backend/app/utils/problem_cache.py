@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from .logging_middleware_judge_api import logger, PROBLEM_CACHE_REQUESTS
+
+
+@dataclass
+class FetchedProblem:
+    """A problem definition as returned by the storage backend."""
+
+    problem: dict
+    size: int  # bytes of the raw JSON
+    version: str  # content hash of the raw JSON
+    etag: Optional[str] = None  # validator for conditional requests
+
+
+@dataclass
+class _Entry:
+    fetched: FetchedProblem
+    validated_at: float
+
+
+# loader(problem_id, etag) -> 새 정의, 또는 etag가 그대로 유효하면 None(304 Not Modified)
+Loader = Callable[[str, Optional[str]], Awaitable[Optional[FetchedProblem]]]
+
+
+class _LeaderCancelled(Exception):
+    """The request loading a problem for others was cancelled; the waiters load it again."""
+
+
+def content_version(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+class ProblemCache:
+    """
+    In-process LRU cache of problem definitions with a byte budget.
+
+    Entries younger than ``ttl`` seconds are served directly; older ones are
+    revalidated with a conditional request (ETag) through ``loader``.
+    Concurrent misses for the same problem share a single load.
+
+    Cached problem dicts are shared between requests and must be treated as
+    read-only.
+    """
+
+    def __init__(self, loader: Loader, max_bytes: int, ttl: float):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def _put(self, problem_id: str, fetched: FetchedProblem) -> None:
+        self._drop(problem_id)
+        if fetched.size > self.max_bytes:
+            logger.warning(f"Problem {problem_id} ({fetched.size} bytes) exceeds the cache budget")
+            return
+        self._entries[problem_id] = _Entry(fetched, time.monotonic())
+        self._bytes += fetched.size
+        while self._bytes > self.max_bytes:
+            evicted, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.fetched.size
+            logger.info(f"Evicted problem {evicted} from the cache")
+
+    def _drop(self, problem_id: str) -> None:
+        entry = self._entries.pop(problem_id, None)
+        if entry:
+            self._bytes -= entry.fetched.size
+
+    async def get(self, problem_id: str) -> FetchedProblem:
+        entry = self._entries.get(problem_id)
+        if entry and time.monotonic() - entry.validated_at < self.ttl:
+            self._entries.move_to_end(problem_id)
+            PROBLEM_CACHE_REQUESTS.labels(result="hit").inc()
+            return entry.fetched
+
+        inflight = self._inflight.get(problem_id)
+        if inflight:
+            PROBLEM_CACHE_REQUESTS.labels(result="coalesced").inc()
+            try:
+                return await asyncio.shield(inflight)
+            except _LeaderCancelled:
+                # 먼저 불러오던 요청만 취소된 것이므로, 대기자 중 하나가 새로 불러온다.
+                return await self.get(problem_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[problem_id] = future
+        try:
+            fetched = await self._load(problem_id, entry)
+        except asyncio.CancelledError:
+            # future.cancel()은 shield로 기다리던 다른 요청까지 취소시키므로 다시 시도할 예외를 건넨다.
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 대기자가 없으면 "exception was never retrieved" 경고가 나지 않도록 소비한다.
+            future.exception()
+            raise
+        else:
+            future.set_result(fetched)
+            return fetched
+        finally:
+            self._inflight.pop(problem_id, None)
+
+    async def _load(self, problem_id: str, entry: Optional[_Entry]) -> FetchedProblem:
+        etag = entry.fetched.etag if entry else None
+        fetched = await self.loader(problem_id, etag)
+        if fetched is None and entry:
+            PROBLEM_CACHE_REQUESTS.labels(result="revalidated").inc()
+            self._put(problem_id, entry.fetched)
+            return entry.fetched
+        PROBLEM_CACHE_REQUESTS.labels(result="miss").inc()
+        self._put(problem_id, fetched)
+        return fetched
+
+    async def refresh(self, problem_id: str) -> FetchedProblem:
+        """Revalidate ``problem_id`` now regardless of its age."""
+        entry = self._entries.get(problem_id)
+        if entry:
+            entry.validated_at = float("-inf")
+        return await self.get(problem_id)
+
+    def cached_ids(self) -> list[str]:
+        return list(self._entries)
+
+    def invalidate(self, problem_id: str) -> None:
+        self._drop(problem_id)
+
+
+def problem_cache_from_env(loader: Loader) -> ProblemCache:
+    return ProblemCache(
+        loader,
+        max_bytes=int(os.getenv("PROBLEM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        ttl=float(os.getenv("PROBLEM_CACHE_TTL_SECONDS", "30")),
+    )
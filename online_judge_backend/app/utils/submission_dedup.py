@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .logging_middleware_judge_api import logger, SUBMISSION_DEDUP
+
+
+def submission_key(
+    language: str,
+    code: str,
+    problem_id: str,
+    version: str,
+    cases: Optional[list[int]] = None,
+) -> str:
+    """
+    Identify a graded run: the same code on the same problem content version
+    and test case selection produces the same worker job.
+    """
+    raw = json.dumps([language, problem_id, version, cases, hashlib.sha256(code.encode()).hexdigest()])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+@dataclass
+class _Flight:
+    key: str
+    cacheable: bool
+    started: float
+    followers: list[str] = field(default_factory=list)
+
+
+class SubmissionDedup:
+    """
+    Coalesces identical submissions and remembers their verdicts (per API replica).
+
+    - In flight: a submission whose key is already running is attached as a
+      follower of that job (the leader) instead of being published again;
+      the leader's progress/final messages are fanned out to every follower.
+    - Verdict cache: the raw worker results of a finished, cacheable job are
+      kept for ``ttl`` seconds (at most ``max_entries``, LRU), so a repeat
+      submission is graded without running anything.
+    - Ready finals: final messages of cached submissions, held until the
+      client's WebSocket connects (or ``ttl`` passes).
+
+    Worker progress only reaches the replica that published the job, so
+    submissions are only coalesced with jobs started by the same replica.
+    With ``coalesce`` off, every submission runs, but verdicts are still cached.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, flight_ttl: float, coalesce: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flight_ttl = flight_ttl
+        self.coalesce = coalesce
+        self._flights: dict[str, _Flight] = {}  # 리더 requestId -> 진행 중인 작업
+        self._leaders: dict[str, str] = {}  # key -> 리더 requestId
+        self._verdicts: OrderedDict[str, tuple[float, list[dict]]] = OrderedDict()
+        self._ready: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    @property
+    def cache_enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    # 결과 캐시
+    def cached(self, key: str) -> Optional[list[dict]]:
+        entry = self._verdicts.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._verdicts[key]
+            return None
+        self._verdicts.move_to_end(key)
+        SUBMISSION_DEDUP.labels(result="cache_hit").inc()
+        return entry[1]
+
+    def _remember(self, key: str, results: list[dict]) -> None:
+        if not self.cache_enabled:
+            return
+        self._verdicts.pop(key, None)
+        self._verdicts[key] = (time.monotonic() + self.ttl, results)
+        while len(self._verdicts) > self.max_entries:
+            self._verdicts.popitem(last=False)
+
+    # 진행 중인 작업 합치기
+    def _expire_flights(self, now: float) -> None:
+        for rid, flight in list(self._flights.items()):
+            if now - flight.started > self.flight_ttl:
+                # final이 오지 않은 작업 (API 재시작 전 발행 등): 새 요청은 다시 실행한다.
+                del self._flights[rid]
+                if self._leaders.get(flight.key) == rid:
+                    del self._leaders[flight.key]
+
+    def join(self, key: str, request_id: str, cacheable: bool) -> Optional[str]:
+        """
+        Attach ``request_id`` to a running job with the same key and return
+        the leader's id, or register it as a new leader and return None.
+        """
+        now = time.monotonic()
+        self._expire_flights(now)
+        leader = self._leaders.get(key) if self.coalesce else None
+        if leader is not None:
+            self._flights[leader].followers.append(request_id)
+            SUBMISSION_DEDUP.labels(result="coalesced").inc()
+            logger.info(f"Submission {request_id} joined the running job {leader}")
+            return leader
+        if self.coalesce:
+            self._leaders[key] = request_id
+        self._flights[request_id] = _Flight(key, cacheable, now)
+        SUBMISSION_DEDUP.labels(result="miss").inc()
+        return None
+
+    def running(self, key: str) -> bool:
+        """True if a submission with ``key`` would be attached to a running job."""
+        return self.coalesce and key in self._leaders
+
+    def followers(self, leader: str) -> list[str]:
+        flight = self._flights.get(leader)
+        return list(flight.followers) if flight else []
+
+    def finish(self, leader: str, results: Optional[list[dict]]) -> list[str]:
+        """
+        End the job of ``leader`` and return its followers. ``results`` are
+        the raw worker results (None if the job failed); they are cached if
+        the job is cacheable and no case hit a time limit.
+        """
+        flight = self._flights.pop(leader, None)
+        if flight is None:
+            return []
+        if self._leaders.get(flight.key) == leader:
+            del self._leaders[flight.key]
+        # 시간 제한 근처의 판정은 실행마다 달라질 수 있으므로 저장하지 않는다.
+        if flight.cacheable and results and not any(r.get("timedOut") for r in results):
+            self._remember(flight.key, results)
+        return flight.followers
+
+    # 캐시로 채점한 요청의 final 보관
+    def hold(self, request_id: str, final: dict) -> None:
+        now = time.monotonic()
+        while self._ready and next(iter(self._ready.values()))[0] <= now:
+            self._ready.popitem(last=False)
+        self._ready[request_id] = (now + self.ttl, final)
+        while len(self._ready) > self.max_entries:
+            self._ready.popitem(last=False)
+
+    def take(self, request_id: str) -> Optional[dict]:
+        entry = self._ready.pop(request_id, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+def submission_dedup_from_env() -> SubmissionDedup:
+    """Build the API's submission deduplication from ``SUBMISSION_DEDUP`` and ``VERDICT_CACHE_*``."""
+    return SubmissionDedup(
+        ttl=float(os.getenv("VERDICT_CACHE_TTL_SECONDS", "600")),
+        max_entries=int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "1000")),
+        flight_ttl=float(os.getenv("META_STORE_TTL_SECONDS", "900")),
+        coalesce=os.getenv("SUBMISSION_DEDUP", "true").lower() in ("1", "true", "yes"),
+    )
@@ -0,0 +1,170 @@
+"""
+Fork server ("zygote") for Python submissions.
+
+Started by the worker as ``python3 zygote.py <control fd> <file>``. It
+compiles the submission once and answers ``ready`` (or ``error`` if it does
+not compile) on the control socket. For every request it receives a report
+socket and the stdin/stdout/stderr pipes via SCM_RIGHTS, forks a child that
+runs the code as ``__main__`` the way ``python3 <file>`` would, and writes the
+same lines as the C launcher to the report socket: ``<pid>`` right away and
+``<status> <maxrss> <utime> <stime>`` once the child has exited. Like the
+launcher, it reaps a child only after the worker has acknowledged the pid
+(one byte, or EOF, on the report socket), so the pid cannot be reused while
+the worker may still signal it.
+
+This file runs outside the app package and only uses the standard library.
+"""
+import os
+import resource
+import selectors
+import socket
+import sys
+import types
+
+try:
+    import ctypes
+
+    _libc = ctypes.CDLL(None, use_errno=True)
+except (ImportError, OSError):
+    _libc = None
+
+_PR_SET_PDEATHSIG = 1
+_SIGKILL = 9
+
+
+def _die_with_parent() -> None:
+    if _libc is not None:
+        _libc.prctl(_PR_SET_PDEATHSIG, _SIGKILL, 0, 0, 0)
+
+
+def _exit_status(e: SystemExit) -> int:
+    # CPython의 handle_system_exit()와 같은 규칙
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code & 0xFF
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def _run(code: types.CodeType, path: str) -> int:
+    # 일반 실행에서는 사용자 코드가 스택의 맨 아래이므로, 이 서버의 프레임 수만큼 재귀 한도를 늘린다.
+    depth, frame = 1, sys._getframe()  # exec() 호출도 한 단계로 센다
+    while frame is not None:
+        depth, frame = depth + 1, frame.f_back
+    sys.setrecursionlimit(sys.getrecursionlimit() + depth)
+    main = types.ModuleType("__main__")
+    main.__file__ = path
+    main.__cached__ = None
+    sys.modules["__main__"] = main
+    try:
+        exec(code, main.__dict__)
+        status = 0
+    except SystemExit as e:
+        status = _exit_status(e)
+    except BaseException as e:
+        # python3 <file>과 같은 traceback이 되도록 이 파일의 프레임은 뺀다.
+        sys.excepthook(type(e), e, e.__traceback__.tb_next)
+        status = 1
+    return status
+
+
+def _child(code: types.CodeType, path: str, fds: list[int], options: list[str]) -> None:
+    try:
+        cpu, as_limit, cpu_limit, cgroup = options
+        os.setsid()
+        _die_with_parent()
+        for target, fd in zip((0, 1, 2), fds[1:]):
+            os.dup2(fd, target)
+        os.closerange(3, resource.getrlimit(resource.RLIMIT_NOFILE)[0])
+        if cgroup != "-":
+            with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+                f.write("0")
+        if int(cpu) >= 0:
+            os.sched_setaffinity(0, {int(cpu)})
+        if int(as_limit):
+            resource.setrlimit(resource.RLIMIT_AS, (int(as_limit), int(as_limit)))
+        if int(cpu_limit):
+            resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_limit), int(cpu_limit) + 1))
+        sys.argv = [path]
+        sys.path[0] = os.path.dirname(path)
+    except BaseException as e:
+        os.write(2, f"zygote: cannot set up the child: {e}\n".encode())
+        os._exit(121)
+    # os._exit() 대신 인터프리터를 정상 종료시킨다: non-daemon 스레드 대기, atexit 핸들러,
+    # 버퍼 flush(실패하면 120)를 python3 <file>과 똑같이 CPython이 처리한다.
+    raise SystemExit(_run(code, path))
+
+
+class _Child:
+    def __init__(self, pid: int, pidfd: int, report: socket.socket):
+        self.pid = pid
+        self.pidfd = pidfd
+        self.report = report
+        self.exited = False
+        self.acked = False
+
+    def reap(self) -> None:
+        _, status, ru = os.wait4(self.pid, 0)
+        os.close(self.pidfd)
+        try:
+            self.report.sendall(
+                f"{status} {ru.ru_maxrss} {ru.ru_utime:.6f} {ru.ru_stime:.6f}\n".encode()
+            )
+        except OSError:
+            pass
+        self.report.close()
+
+
+def main() -> None:
+    control = socket.socket(fileno=int(sys.argv[1]))
+    path = sys.argv[2]
+    _die_with_parent()
+    try:
+        with open(path, "rb") as f:
+            code = compile(f.read(), path, "exec", dont_inherit=True)
+    except BaseException:
+        # 컴파일 오류는 워커가 일반 실행으로 재현한다 (같은 오류 메시지를 위해).
+        control.sendall(b"error")
+        return
+    control.sendall(b"ready")
+
+    selector = selectors.DefaultSelector()
+    selector.register(control, selectors.EVENT_READ)
+    while True:
+        for key, _ in selector.select():
+            if key.data is None:
+                msg, fds, _, _ = socket.recv_fds(control, 4096, 4)
+                if not msg:
+                    return  # 워커가 제어 소켓을 닫음
+                pid = os.fork()
+                if pid == 0:
+                    _child(code, path, fds, msg.decode().split())
+                report = socket.socket(fileno=fds[0])
+                for fd in fds[1:]:
+                    os.close(fd)
+                child = _Child(pid, os.pidfd_open(pid), report)
+                try:
+                    report.sendall(f"{pid}\n".encode())
+                except OSError:
+                    child.acked = True  # 워커가 이미 소켓을 닫음
+                selector.register(child.pidfd, selectors.EVENT_READ, child)
+                if not child.acked:
+                    selector.register(report, selectors.EVENT_READ, child)
+            else:
+                child = key.data
+                selector.unregister(key.fd)
+                if key.fd == child.pidfd:
+                    child.exited = True
+                else:
+                    try:
+                        child.report.recv(16)  # 확인 바이트 또는 EOF
+                    except OSError:
+                        pass
+                    child.acked = True
+                if child.exited and child.acked:
+                    child.reap()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+# 언어별로 실행에 필요한 도구: 없으면 그 언어는 건너뛴다.
+TOOLCHAINS = {"c": ["gcc"], "cpp": ["g++"], "java": ["javac", "java"], "python": ["python3"]}
+
+# 기준 결과와 비교하는 항목. 작은 값은 흔들림이 크므로 상대 허용치에 절대 허용치(ms)를 더한다.
+REGRESSION_FIELDS = ["compileMs", "caseWallMs", "judgeOverheadMs"]
+
+
+@dataclass
+class Program:
+    """A canonical benchmark program in every language, with its input and answer."""
+
+    name: str
+    sources: dict[str, str]
+    stdin: Callable[[str, float], str]  # (language, scale) -> 입력
+    expected: Callable[[str], str]  # 입력 -> 정답
+
+
+def _cpu_answer(stdin: str) -> str:
+    # sum(i * i % 7 for i in range(n)): i * i % 7은 주기 7로 반복된다.
+    n = int(stdin)
+    pattern = [i * i % 7 for i in range(7)]
+    return str(n // 7 * sum(pattern) + sum(pattern[: n % 7]))
+
+
+def _io_input(lang: str, scale: float) -> str:
+    m = max(1, int(200_000 * scale))
+    return f"{m}\n" + "\n".join(str(i * 7919 % 1_000_003) for i in range(m)) + "\n"
+
+
+def _io_answer(stdin: str) -> str:
+    lines = stdin.split()
+    return "\n".join(str(int(x) * 2) for x in lines[1:])
+
+
+PROGRAMS = [
+    Program(
+        "hello",
+        {
+            "python": 'print("Hello, World!")\n',
+            "c": '#include <stdio.h>\n\nint main(void) {\n    puts("Hello, World!");\n    return 0;\n}\n',
+            "cpp": '#include <iostream>\n\nint main() {\n    std::cout << "Hello, World!\\n";\n    return 0;\n}\n',
+            "java": (
+                "public class Main {\n    public static void main(String[] args) {\n"
+                '        System.out.println("Hello, World!");\n    }\n}\n'
+            ),
+        },
+        lambda lang, scale: "",
+        lambda stdin: "Hello, World!",
+    ),
+    Program(
+        "cpu",
+        {
+            "python": "n = int(input())\ns = 0\nfor i in range(n):\n    s += i * i % 7\nprint(s)\n",
+            "c": (
+                "#include <stdio.h>\n\nint main(void) {\n    long long n, s = 0;\n    scanf(\"%lld\", &n);\n"
+                "    for (long long i = 0; i < n; i++) s += i * i % 7;\n    printf(\"%lld\\n\", s);\n    return 0;\n}\n"
+            ),
+            "cpp": (
+                "#include <iostream>\n\nint main() {\n    long long n, s = 0;\n    std::cin >> n;\n"
+                "    for (long long i = 0; i < n; i++) s += i * i % 7;\n    std::cout << s << '\\n';\n    return 0;\n}\n"
+            ),
+            "java": (
+                "import java.util.Scanner;\n\npublic class Main {\n    public static void main(String[] args) {\n"
+                "        long n = new Scanner(System.in).nextLong(), s = 0;\n"
+                "        for (long i = 0; i < n; i++) s += i * i % 7;\n        System.out.println(s);\n    }\n}\n"
+            ),
+        },
+        # 인터프리터는 같은 반복 수에서 수십 배 느리므로 반복 수를 줄여 비슷한 시간이 걸리게 한다.
+        lambda lang, scale: str(int((2_000_000 if lang == "python" else 100_000_000) * scale)),
+        _cpu_answer,
+    ),
+    Program(
+        "io",
+        {
+            "python": (
+                "import sys\n\ndata = sys.stdin.buffer.read().split()\n"
+                "sys.stdout.write(\"\\n\".join(str(int(x) * 2) for x in data[1:]))\nsys.stdout.write(\"\\n\")\n"
+            ),
+            "c": (
+                "#include <stdio.h>\n\nint main(void) {\n    int m;\n    long long x;\n    scanf(\"%d\", &m);\n"
+                "    for (int i = 0; i < m; i++) {\n        scanf(\"%lld\", &x);\n        printf(\"%lld\\n\", x * 2);\n"
+                "    }\n    return 0;\n}\n"
+            ),
+            "cpp": (
+                "#include <iostream>\n\nint main() {\n    std::ios::sync_with_stdio(false);\n    std::cin.tie(nullptr);\n"
+                "    int m;\n    long long x;\n    std::cin >> m;\n"
+                "    for (int i = 0; i < m; i++) {\n        std::cin >> x;\n        std::cout << x * 2 << '\\n';\n"
+                "    }\n    return 0;\n}\n"
+            ),
+            "java": (
+                "import java.io.*;\n\npublic class Main {\n    public static void main(String[] args) throws IOException {\n"
+                "        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));\n"
+                "        PrintWriter out = new PrintWriter(new BufferedWriter(new OutputStreamWriter(System.out)));\n"
+                "        int m = Integer.parseInt(in.readLine().trim());\n"
+                "        for (int i = 0; i < m; i++) out.println(Long.parseLong(in.readLine().trim()) * 2);\n"
+                "        out.flush();\n    }\n}\n"
+            ),
+        },
+        _io_input,
+        _io_answer,
+    ),
+    Program(
+        "memory",
+        {
+            "python": (
+                "n = int(input())\nb = bytearray(n << 20)\nfor i in range(0, len(b), 4096):\n    b[i] = 1\n"
+                "print(sum(b[::4096]) // 256)\n"
+            ),
+            "c": (
+                "#include <stdio.h>\n#include <stdlib.h>\n\nint main(void) {\n    long n, s = 0;\n    scanf(\"%ld\", &n);\n"
+                "    char *b = malloc(n << 20);\n    for (long i = 0; i < n << 20; i += 4096) b[i] = 1;\n"
+                "    for (long i = 0; i < n << 20; i += 4096) s += b[i];\n    printf(\"%ld\\n\", s / 256);\n"
+                "    free(b);\n    return 0;\n}\n"
+            ),
+            "cpp": (
+                "#include <iostream>\n#include <vector>\n\nint main() {\n    long n, s = 0;\n    std::cin >> n;\n"
+                "    std::vector<char> b(n << 20);\n    for (long i = 0; i < n << 20; i += 4096) b[i] = 1;\n"
+                "    for (long i = 0; i < n << 20; i += 4096) s += b[i];\n    std::cout << s / 256 << '\\n';\n"
+                "    return 0;\n}\n"
+            ),
+            "java": (
+                "import java.util.Scanner;\n\npublic class Main {\n    public static void main(String[] args) {\n"
+                "        int n = new Scanner(System.in).nextInt();\n        byte[] b = new byte[n << 20];\n"
+                "        long s = 0;\n        for (int i = 0; i < b.length; i += 4096) b[i] = 1;\n"
+                "        for (int i = 0; i < b.length; i += 4096) s += b[i];\n        System.out.println(s / 256);\n"
+                "    }\n}\n"
+            ),
+        },
+        # 256 MB 메모리 제한 안에서 JVM 힙 여유를 남긴다.
+        lambda lang, scale: str(max(1, int(64 * scale))),
+        lambda stdin: stdin.strip(),
+    ),
+]
+
+
+def available_languages(wanted: list[str]) -> tuple[list[str], list[str]]:
+    ok = [lang for lang in wanted if all(shutil.which(tool) for tool in TOOLCHAINS[lang])]
+    return ok, [lang for lang in wanted if lang not in ok]
+
+
+async def bench_one(
+    executor, lang: str, program: Program, cases: int, repeat: int, scale: float, parallelism: int
+) -> dict:
+    """
+    Compile and run ``program`` ``repeat`` times with ``cases`` identical test
+    cases through ``prepare_code`` and ``execute_code_multiple``.
+
+    The program's own work is its CPU time (``cpuTime``); everything else in
+    a case's wall time is judge overhead (process start, pipes, waiting for
+    the exit). ``judgeOverheadMs`` spreads the whole run (zygote start,
+    scheduling, grading) over the cases.
+    """
+    from online_judge_backend.app.scratch import scratch_space
+
+    language = executor.SupportedLanguage(lang)
+    stdin = program.stdin(lang, scale)
+    answer = program.expected(stdin)
+    compile_ms, job_ms, overhead_ms = [], [], []
+    walls, cpus, memory, passed = [], [], 0, True
+    for _ in range(repeat):
+        with scratch_space().job() as workdir:
+            start = time.perf_counter()
+            prepared = await executor.prepare_code(language, program.sources[lang], None, workdir)
+            compile_ms.append((time.perf_counter() - start) * 1000)
+            if prepared.error is not None:
+                raise RuntimeError(f"{lang}/{program.name} does not compile: {prepared.error}")
+            start = time.perf_counter()
+            results = await executor.execute_code_multiple(
+                language, "", [stdin] * cases, time_limit=10000, memory_limit=256,
+                expected=[answer] * cases, parallelism=parallelism, prepared=prepared,
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+        job_ms.append(elapsed)
+        overhead_ms.append((elapsed - sum(r.cpuTime for r in results)) / cases)
+        walls += [r.wallTime for r in results]
+        cpus += [r.cpuTime for r in results]
+        memory = max([memory, *(r.memoryUsed for r in results)])
+        passed = passed and len(results) == cases and all(executor._passed(r, answer) for r in results)
+    return {
+        "language": lang,
+        "program": program.name,
+        "cases": cases,
+        "repeat": repeat,
+        "compileMs": statistics.median(compile_ms),
+        "jobMs": statistics.median(job_ms),
+        "caseWallMs": statistics.median(walls),
+        "caseCpuMs": statistics.median(cpus),
+        "caseOverheadMs": statistics.median(w - c for w, c in zip(walls, cpus)),
+        "judgeOverheadMs": statistics.median(overhead_ms),
+        "memoryKb": memory,
+        "passed": passed,
+    }
+
+
+def machine_info() -> dict:
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float, slack_ms: float) -> list[str]:
+    """Entries of ``report`` slower than the same entry of ``baseline`` beyond the tolerance."""
+    base = {(e["language"], e["program"], e["cases"]): e for e in baseline.get("results", [])}
+    regressions = []
+    for entry in report["results"]:
+        old = base.get((entry["language"], entry["program"], entry["cases"]))
+        if old is None:
+            continue
+        if old.get("passed") and not entry["passed"]:
+            regressions.append(f"{entry['language']}/{entry['program']}x{entry['cases']}: wrong answer")
+        for field in REGRESSION_FIELDS:
+            if field in old and entry[field] > old[field] * (1 + tolerance) + slack_ms:
+                regressions.append(
+                    f"{entry['language']}/{entry['program']}x{entry['cases']} {field}: "
+                    f"{entry[field]:.1f} ms (baseline {old[field]:.1f} ms)"
+                )
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    # 실행 환경 설정은 executor를 import할 때 읽히므로 그 전에 정한다.
+    if not args.compile_cache:
+        os.environ["COMPILE_CACHE_ENABLED"] = "false"
+    from online_judge_backend.app import executor
+
+    # 케이스마다 남는 워커 로그는 측정에 섞이지 않도록 끈다.
+    logging.getLogger("worker").setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    languages, skipped = available_languages(args.languages)
+    programs = [p for p in PROGRAMS if p.name in args.programs]
+    results = []
+    for lang in languages:
+        for program in programs:
+            for cases in args.cases:
+                entry = await bench_one(executor, lang, program, cases, args.repeat, args.scale, args.parallelism)
+                print(
+                    f"{lang:>6} {program.name:<7} x{cases:<3} compile {entry['compileMs']:8.1f} ms  "
+                    f"case wall {entry['caseWallMs']:8.1f} ms  cpu {entry['caseCpuMs']:8.1f} ms  "
+                    f"overhead {entry['judgeOverheadMs']:7.1f} ms/case",
+                    file=sys.stderr,
+                )
+                results.append(entry)
+    return {
+        "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": machine_info(),
+        "config": {
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "parallelism": args.parallelism,
+            "compileCache": args.compile_cache,
+            "warmRuntime": executor.WARM_RUNTIME,
+            "sandbox": os.getenv("EXECUTION_BACKEND", "local"),
+        },
+        "skippedLanguages": skipped,
+        "results": results,
+    }
+
+
+def _csv(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="python -m online_judge_backend.bench.executor_bench",
+        description="Measure compile time and per-case judge overhead of the executor for each language.",
+    )
+    p.add_argument("--languages", type=_csv, default=list(TOOLCHAINS), help="comma-separated (default: all)")
+    p.add_argument("--programs", type=_csv, default=[p.name for p in PROGRAMS],
+                   help="comma-separated of hello,cpu,io,memory (default: all)")
+    p.add_argument("--cases", type=lambda v: [int(c) for c in _csv(v)], default=[1, 10],
+                   help="test case counts to run (default: 1,10)")
+    p.add_argument("--repeat", type=int, default=3, help="runs per entry; medians are reported (default: 3)")
+    p.add_argument("--scale", type=float, default=1.0, help="multiplies the cpu/io/memory input sizes")
+    p.add_argument("--parallelism", type=int, default=1, help="test cases run at once (default: 1)")
+    p.add_argument("--compile-cache", action="store_true", help="keep the compiled-artifact cache on")
+    p.add_argument("--verbose", action="store_true", help="keep the executor's log output")
+    p.add_argument("--output", type=Path, help="write the report here instead of stdout")
+    p.add_argument("--baseline", type=Path, help="report to compare with; exit 1 on a regression")
+    p.add_argument("--tolerance", type=float, default=0.2, help="relative slack of --baseline (default: 0.2)")
+    p.add_argument("--slack-ms", type=float, default=2.0, help="absolute slack of --baseline (default: 2 ms)")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("machine") != report["machine"]:
+            print("warning: the baseline was measured on a different machine", file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance, args.slack_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .prom import Samples, histogram_summary, scrape, total
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 워커 CPU/메모리를 워커의 /metrics에서 읽는다.
+    psutil = None
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_WORKLOAD = Path(__file__).with_name("submissions.jsonl")
+# start_metrics_server()가 워커마다 차례로 잡는 포트 범위
+WORKER_METRICS_PORTS = range(58001, 58100)
+_COMMENT = {"python": "#", "c": "//", "cpp": "//", "java": "//"}
+
+# 기준 결과와 비교하는 항목: (경로, 값이 클수록 좋은가)
+REGRESSION_CHECKS = [
+    ("throughput", True),
+    ("latency.final.p50", False),
+    ("latency.final.p99", False),
+    ("worker.cpuSecondsPerSubmission", False),
+    ("failureRate", False),
+]
+
+
+@dataclass
+class Submission:
+    """One workload entry: a recorded or hand-written submission."""
+
+    language: str
+    code: str
+    problemId: str
+    token: Optional[str] = None
+    weight: float = 1.0
+    # 녹화된 워크로드에서 첫 제출로부터의 제출 시각(초)
+    at: Optional[float] = None
+
+
+@dataclass
+class Outcome:
+    """What the client saw for one submission; latencies are seconds from the POST."""
+
+    result: str = "pending"  # completed | shed | error | timeout
+    verdict: Optional[str] = None
+    cached: bool = False
+    accepted: Optional[float] = None
+    first_progress: Optional[float] = None
+    final: Optional[float] = None
+    error: Optional[str] = None
+
+
+def load_workload(path: Path) -> list[Submission]:
+    subs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                subs.append(Submission(**json.loads(line)))
+    if not subs:
+        raise SystemExit(f"No submissions in {path}")
+    return subs
+
+
+def request_body(sub: Submission, tag: Optional[str]) -> dict:
+    """
+    The ``/execute_v*`` body of ``sub``. With a ``tag``, a comment makes the
+    code unique so the API's verdict cache and deduplication do not skip the run.
+    """
+    code = sub.code
+    if tag is not None:
+        code = f"{code.rstrip()}\n{_COMMENT.get(sub.language, '#')} bench {tag}\n"
+    return {"language": sub.language, "code": code, "problemId": sub.problemId, "token": sub.token}
+
+
+async def submit(
+    session: aiohttp.ClientSession, api: str, endpoint: str, body: dict, timeout: float
+) -> Outcome:
+    """POST one submission and follow its WebSocket until the ``final`` message."""
+    out = Outcome()
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            async with session.post(f"{api}{endpoint}", json=body) as resp:
+                out.accepted = time.perf_counter() - start
+                data = await resp.json(content_type=None)
+                status = resp.status
+            if status in (429, 503):
+                out.result = "shed"
+                return out
+            if status != 200:
+                out.result, out.error = "error", f"HTTP {status}: {str(data)[:200]}"
+                return out
+            if data.get("cached"):
+                out.result, out.cached = "completed", True
+                out.final = out.accepted
+                out.verdict = data["final"].get("status")
+                return out
+            ws_url = "ws" + api[len("http"):] + f"/ws/progress/{data['requestId']}"
+            async with session.ws_connect(ws_url) as ws:
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    m = json.loads(msg.data)
+                    if m.get("type") == "progress" and out.first_progress is None:
+                        out.first_progress = time.perf_counter() - start
+                    elif m.get("type") == "final":
+                        out.final = time.perf_counter() - start
+                        out.result = "completed"
+                        out.verdict = m.get("status", "failure")
+                        return out
+            out.result, out.error = "error", "WebSocket closed before the final message"
+    except TimeoutError:
+        out.result = "timeout"
+    except aiohttp.ClientError as e:
+        out.result, out.error = "error", repr(e)
+    return out
+
+
+async def closed_loop(n: int, concurrency: int, run: Callable[[int], Awaitable[None]]) -> None:
+    """``concurrency`` clients that each submit again as soon as their last submission finishes."""
+    counter = iter(range(n))
+
+    async def client() -> None:
+        for i in counter:
+            await run(i)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+
+
+async def open_loop(offsets: list[float], run: Callable[[int], Awaitable[None]]) -> None:
+    """Start submission ``i`` at ``offsets[i]`` seconds, however many are still running."""
+    start = time.perf_counter()
+    tasks = []
+    for i, offset in enumerate(offsets):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(run(i)))
+    await asyncio.gather(*tasks)
+
+
+def _tree_cpu_seconds(pid: int) -> float:
+    # 실행이 끝난 자식(컴파일러, 제출 코드)의 시간은 부모의 children_* 에 합산되어 있다.
+    root = psutil.Process(pid)
+    seconds = 0.0
+    for proc in [root, *root.children(recursive=True)]:
+        try:
+            t = proc.cpu_times()
+            seconds += t.user + t.system + t.children_user + t.children_system
+        except psutil.NoSuchProcess:
+            pass
+    return seconds
+
+
+def _tree_rss(pid: int) -> int:
+    root = psutil.Process(pid)
+    rss = 0
+    for proc in [root, *root.children(recursive=True)]:
+        try:
+            rss += proc.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return rss
+
+
+class WorkerProbe:
+    """
+    Worker-side measurements of a run: Prometheus scrapes of every worker
+    before and after, plus CPU seconds and peak RSS. CPU and memory come
+    from the worker process trees (including compilers and submitted code)
+    when the workers were started here and psutil is installed, otherwise
+    from each worker's own ``process_*`` metrics.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, metrics_urls: list[str], pids: list[int]):
+        self.session = session
+        self.metrics_urls = metrics_urls
+        self.pids = pids if psutil is not None else []
+        self.before: list[Samples] = []
+        self.after: list[Samples] = []
+        self.peak_rss = 0
+        self._cpu_start = 0.0
+        self._cpu_end = 0.0
+        self._sampler: Optional[asyncio.Task] = None
+
+    @property
+    def source(self) -> str:
+        return "psutil" if self.pids else "metrics"
+
+    async def _scrape_all(self) -> list[Samples]:
+        return list(await asyncio.gather(*(scrape(self.session, url) for url in self.metrics_urls)))
+
+    async def _cpu(self, samples: list[Samples]) -> float:
+        if self.pids:
+            return sum(_tree_cpu_seconds(pid) for pid in self.pids)
+        return sum(total(s, "process_cpu_seconds_total") for s in samples)
+
+    async def _rss(self) -> int:
+        if self.pids:
+            return sum(_tree_rss(pid) for pid in self.pids)
+        samples = await self._scrape_all()
+        return int(sum(total(s, "process_resident_memory_bytes") for s in samples))
+
+    async def _sample(self, interval: float) -> None:
+        while True:
+            try:
+                self.peak_rss = max(self.peak_rss, await self._rss())
+            except Exception:
+                pass
+            await asyncio.sleep(interval)
+
+    async def start(self, interval: float = 0.5) -> None:
+        self.before = await self._scrape_all()
+        self._cpu_start = await self._cpu(self.before)
+        self._sampler = asyncio.create_task(self._sample(interval))
+
+    async def stop(self) -> None:
+        self._sampler.cancel()
+        self.after = await self._scrape_all()
+        self._cpu_end = await self._cpu(self.after)
+
+    def summary(self, submissions: int) -> dict:
+        phases = {
+            "queueWait": histogram_summary(self.before, self.after, "worker_queue_wait_seconds"),
+            "slotWait": histogram_summary(self.before, self.after, "worker_slot_wait_seconds"),
+            "compile": histogram_summary(self.before, self.after, "worker_stage_duration_seconds", stage="compile"),
+            "run": histogram_summary(self.before, self.after, "worker_stage_duration_seconds", stage="run"),
+            "publish": histogram_summary(self.before, self.after, "worker_stage_duration_seconds", stage="publish"),
+            "jobLatency": histogram_summary(self.before, self.after, "worker_job_latency_seconds"),
+        }
+        cpu = self._cpu_end - self._cpu_start
+        jobs = sum(
+            total(a, "worker_jobs_total") - total(b, "worker_jobs_total")
+            for b, a in zip(self.before, self.after)
+        )
+        return {
+            "workers": len(self.metrics_urls),
+            "jobs": int(jobs),
+            "phases": phases,
+            "cpuSeconds": cpu,
+            "cpuSecondsPerSubmission": cpu / submissions if submissions else None,
+            "peakRssBytes": self.peak_rss,
+            "resourceSource": self.source,
+        }
+
+
+class LocalStack:
+    """An API server and workers started as subprocesses of the benchmark."""
+
+    def __init__(self, api: str, workers: int):
+        self.api = api
+        self.workers = workers
+        self.log_dir = Path(tempfile.mkdtemp(prefix="judge-bench-"))
+        self.procs: list[subprocess.Popen] = []
+        self.worker_pids: list[int] = []
+        self.metrics_urls: list[str] = []
+
+    def _spawn(self, name: str, args: list[str]) -> subprocess.Popen:
+        log = open(self.log_dir / f"{name}.log", "w")
+        proc = subprocess.Popen([sys.executable, "-m", *args], cwd=REPO_ROOT, stdout=log, stderr=subprocess.STDOUT)
+        self.procs.append(proc)
+        return proc
+
+    async def _metrics_ports(self, session: aiohttp.ClientSession) -> set[int]:
+        async def probe(port: int) -> Optional[int]:
+            try:
+                samples = await scrape(session, f"http://127.0.0.1:{port}/")
+            except (aiohttp.ClientError, OSError):
+                return None
+            return port if any(name == "worker_slots_total" for name, _ in samples) else None
+
+        found = await asyncio.gather(*(probe(p) for p in WORKER_METRICS_PORTS))
+        return {p for p in found if p is not None}
+
+    async def _wait(self, proc: subprocess.Popen, name: str, ready: Callable[[], Awaitable[bool]], timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise SystemExit(f"{name} exited with {proc.returncode}, see {self.log_dir / name}.log")
+            if await ready():
+                return
+            await asyncio.sleep(0.5)
+        raise SystemExit(f"{name} did not become ready in {timeout:.0f}s, see {self.log_dir / name}.log")
+
+    async def start(self, session: aiohttp.ClientSession, timeout: float = 60.0) -> None:
+        print(f"Logs of the local stack: {self.log_dir}", file=sys.stderr)
+        known = await self._metrics_ports(session)
+        for i in range(self.workers):
+            # 워커는 비어 있는 첫 포트에 메트릭 서버를 띄우므로 하나씩 띄워 포트를 알아낸다.
+            name = f"worker-{i}"
+            proc = self._spawn(name, ["online_judge_backend.app.worker"])
+            new: set[int] = set()
+
+            async def worker_ready() -> bool:
+                new.update(await self._metrics_ports(session) - known)
+                return bool(new)
+
+            await self._wait(proc, name, worker_ready, timeout)
+            port = min(new)
+            known.add(port)
+            self.worker_pids.append(proc.pid)
+            self.metrics_urls.append(f"http://127.0.0.1:{port}/")
+
+        url = urlparse(self.api)
+        proc = self._spawn("api", [
+            "uvicorn", "online_judge_backend.app.main:app",
+            "--host", url.hostname or "127.0.0.1", "--port", str(url.port or 80),
+        ])
+
+        async def api_ready() -> bool:
+            # 서버는 startup(브로커 연결 등)이 끝난 뒤에야 요청을 받는다.
+            try:
+                async with session.get(f"{self.api}/autoscale") as resp:
+                    return resp.status == 200
+            except aiohttp.ClientError:
+                return False
+
+        await self._wait(proc, "api", api_ready, timeout)
+
+    def stop(self) -> None:
+        for proc in reversed(self.procs):
+            proc.terminate()
+        for proc in self.procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def percentiles(values: list[float]) -> Optional[dict]:
+    if not values:
+        return None
+    values = sorted(values)
+
+    def rank(q: float) -> float:
+        return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": rank(0.5),
+        "p90": rank(0.9),
+        "p99": rank(0.99),
+        "max": values[-1],
+    }
+
+
+def summarize(outcomes: list[Outcome], elapsed: float) -> dict:
+    results: dict[str, int] = {}
+    verdicts: dict[str, int] = {}
+    for o in outcomes:
+        results[o.result] = results.get(o.result, 0) + 1
+        if o.verdict is not None:
+            verdicts[o.verdict] = verdicts.get(o.verdict, 0) + 1
+    completed = results.get("completed", 0)
+    failed = results.get("error", 0) + results.get("timeout", 0)
+    return {
+        "submissions": len(outcomes),
+        "results": results,
+        "verdicts": verdicts,
+        "cached": sum(o.cached for o in outcomes),
+        "durationSeconds": elapsed,
+        "throughput": completed / elapsed if elapsed > 0 else None,
+        "failureRate": failed / len(outcomes) if outcomes else None,
+        "latency": {
+            "accept": percentiles([o.accepted for o in outcomes if o.accepted is not None]),
+            "firstProgress": percentiles([o.first_progress for o in outcomes if o.first_progress is not None]),
+            "final": percentiles([o.final for o in outcomes if o.final is not None]),
+        },
+        "errors": sorted({o.error for o in outcomes if o.error})[:10],
+    }
+
+
+def _lookup(report: dict, path: str) -> Optional[float]:
+    value = report
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of ``report`` against ``baseline`` beyond a relative ``tolerance``."""
+    regressions = []
+    for path, higher_is_better in REGRESSION_CHECKS:
+        cur, base = _lookup(report, path), _lookup(baseline, path)
+        if cur is None or base is None:
+            continue
+        worse = cur < base * (1 - tolerance) if higher_is_better else cur > base * (1 + tolerance)
+        if worse:
+            regressions.append(f"{path}: {cur:.4g} (baseline {base:.4g})")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    workload = load_workload(args.workload)
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+
+    if args.replay:
+        picks = list(workload)
+        first = min(s.at or 0.0 for s in picks)
+        offsets: Optional[list[float]] = [(s.at or 0.0) - first for s in picks]
+    else:
+        picks = rng.choices(workload, weights=[s.weight for s in workload], k=args.count)
+        offsets = None
+        if args.rate:
+            # 포아송 도착: 제출 간격이 평균 1/rate인 지수분포를 따른다.
+            offsets, t = [], 0.0
+            for _ in picks:
+                offsets.append(t)
+                t += rng.expovariate(args.rate)
+
+    outcomes: list[Outcome] = [Outcome() for _ in picks]
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        stack = LocalStack(args.api, args.workers) if args.spawn else None
+        try:
+            if stack:
+                await stack.start(session)
+            metrics_urls = (stack.metrics_urls if stack else []) + args.worker_metrics
+            probe = WorkerProbe(session, metrics_urls, stack.worker_pids if stack else [])
+            if metrics_urls:
+                await probe.start()
+
+            async def one(i: int) -> None:
+                body = request_body(picks[i], None if args.no_unique else f"{run_id}-{i}")
+                outcomes[i] = await submit(session, args.api, args.endpoint, body, args.timeout)
+
+            start = time.perf_counter()
+            if offsets is not None:
+                await open_loop(offsets, one)
+            else:
+                await closed_loop(len(picks), args.concurrency, one)
+            elapsed = time.perf_counter() - start
+
+            report = {
+                "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "config": {
+                    "api": args.api,
+                    "endpoint": args.endpoint,
+                    "workload": str(args.workload),
+                    "mode": "replay" if args.replay else ("open" if args.rate else "closed"),
+                    "rate": args.rate,
+                    "concurrency": None if offsets is not None else args.concurrency,
+                    "unique": not args.no_unique,
+                    "spawnedWorkers": args.workers if args.spawn else 0,
+                },
+                **summarize(outcomes, elapsed),
+            }
+            if metrics_urls:
+                await probe.stop()
+                report["worker"] = probe.summary(len(picks))
+        finally:
+            if stack:
+                stack.stop()
+    return report
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="python -m online_judge_backend.bench.loadgen",
+        description="Replay submissions against the judge and report throughput and latency as JSON.",
+    )
+    p.add_argument("--api", default=os.getenv("BENCH_API_URL", "http://127.0.0.1:18651"), help="API base URL")
+    p.add_argument("--endpoint", default="/execute_v4", help="submission endpoint (default: /execute_v4)")
+    p.add_argument("--workload", type=Path, default=DEFAULT_WORKLOAD, help="JSONL of submissions")
+    p.add_argument("--count", type=int, default=100, help="submissions to send (ignored with --replay)")
+    p.add_argument("--concurrency", type=int, default=8, help="clients of the closed loop (without --rate)")
+    p.add_argument("--rate", type=float, help="open loop: Poisson arrivals per second")
+    p.add_argument("--replay", action="store_true", help="send every workload entry at its recorded `at` offset")
+    p.add_argument("--seed", type=int, default=0, help="seed of the workload mix and arrivals")
+    p.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for one final message")
+    p.add_argument("--no-unique", action="store_true", help="send code as is (lets the verdict cache answer repeats)")
+    p.add_argument("--spawn", action="store_true", help="start the API and workers here (needs RABBITMQ_URL)")
+    p.add_argument("--workers", type=int, default=1, help="workers to start with --spawn")
+    p.add_argument("--worker-metrics", action="append", default=[], metavar="URL",
+                   help="metrics endpoint of an already running worker (repeatable)")
+    p.add_argument("--output", type=Path, help="write the report here instead of stdout")
+    p.add_argument("--baseline", type=Path, help="report to compare with; exit 1 on a regression")
+    p.add_argument("--tolerance", type=float, default=0.1, help="relative slack of --baseline (default: 0.1)")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    args.api = args.api.rstrip("/")
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import math
+from collections import defaultdict
+from typing import Optional
+
+import aiohttp
+from prometheus_client.parser import text_string_to_metric_families
+
+# 부하 테스트 전후로 워커의 /metrics를 읽어 그 사이에 관측된 분포만 계산한다.
+Samples = dict[tuple[str, tuple], float]
+
+
+async def scrape(session: aiohttp.ClientSession, url: str) -> Samples:
+    """Read every sample of a Prometheus text endpoint as ``{(name, labels): value}``."""
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+        text = await resp.text()
+    samples: Samples = {}
+    for family in text_string_to_metric_families(text):
+        for s in family.samples:
+            samples[(s.name, tuple(sorted(s.labels.items())))] = s.value
+    return samples
+
+
+def total(samples: Samples, name: str, **labels: str) -> float:
+    """Sum of the samples of ``name`` whose labels include ``labels``."""
+    want = set(labels.items())
+    return sum(v for (n, lbl), v in samples.items() if n == name and want <= set(lbl))
+
+
+def histogram_delta(
+    before: list[Samples], after: list[Samples], name: str, **labels: str
+) -> tuple[dict[float, float], float, float]:
+    """
+    Cumulative buckets, sum and count a histogram gained between two scrapes,
+    added up over workers (one ``Samples`` per worker in ``before``/``after``).
+    """
+    want = set(labels.items())
+    buckets: dict[float, float] = defaultdict(float)
+    sums = counts = 0.0
+    for b, a in zip(before, after):
+        for (n, lbl), value in a.items():
+            if not want <= set(lbl):
+                continue
+            delta = value - b.get((n, lbl), 0.0)
+            if n == f"{name}_bucket":
+                buckets[float(dict(lbl)["le"])] += delta
+            elif n == f"{name}_sum":
+                sums += delta
+            elif n == f"{name}_count":
+                counts += delta
+    return dict(buckets), sums, counts
+
+
+def bucket_quantile(q: float, buckets: dict[float, float]) -> Optional[float]:
+    """``histogram_quantile`` of PromQL: linear interpolation inside the bucket."""
+    bounds = sorted(buckets)
+    if not bounds or buckets[bounds[-1]] <= 0:
+        return None
+    rank = q * buckets[bounds[-1]]
+    prev_bound, prev_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if math.isinf(bound):
+                # +Inf 버킷에 걸리면 마지막 유한 경계를 돌려준다.
+                return prev_bound
+            if count == prev_count:
+                return bound
+            return prev_bound + (bound - prev_bound) * (rank - prev_count) / (count - prev_count)
+        prev_bound, prev_count = bound, count
+    return prev_bound
+
+
+def histogram_summary(
+    before: list[Samples], after: list[Samples], name: str, **labels: str
+) -> Optional[dict]:
+    """p50/p90/p99 and mean of what a histogram observed between two scrapes (None if nothing)."""
+    buckets, sums, counts = histogram_delta(before, after, name, **labels)
+    if counts <= 0:
+        return None
+    return {
+        "count": int(counts),
+        "mean": sums / counts,
+        "p50": bucket_quantile(0.5, buckets),
+        "p90": bucket_quantile(0.9, buckets),
+        "p99": bucket_quantile(0.99, buckets),
+    }